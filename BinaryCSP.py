@@ -1,5 +1,8 @@
+import bisect
 from collections import deque
+import time
 import utils
+import vectorised
 """
 	Base class for unary constraints
 	Implement isSatisfied in subclass to use
@@ -14,6 +17,12 @@ class UnaryConstraint:
 	def affects(self, var):
 		return var == self.var
 
+	def filterDomain(self, domain):
+		"""
+		Removes the values that break this constraint from domain, in place.
+		"""
+		domain.difference_update([value for value in domain if not self.isSatisfied(value)])
+
 
 """
 	Implementation of UnaryConstraint
@@ -27,6 +36,9 @@ class BadValueConstraint(UnaryConstraint):
 	def isSatisfied(self, value):
 		return not value == self.badValue
 
+	def filterDomain(self, domain):
+		domain.discard(self.badValue)
+
 	def __repr__(self):
 		return 'BadValueConstraint (%s) {badValue: %s}' % (str(self.var), str(self.badValue))
 
@@ -43,6 +55,9 @@ class GoodValueConstraint(UnaryConstraint):
 	def isSatisfied(self, value):
 		return value == self.goodValue
 
+	def filterDomain(self, domain):
+		domain.intersection_update((self.goodValue,))
+
 	def __repr__(self):
 		return 'GoodValueConstraint (%s) {goodValue: %s}' % (str(self.var), str(self.goodValue))
 
@@ -52,6 +67,8 @@ class GoodValueConstraint(UnaryConstraint):
 	Implement isSatisfied in subclass to use
 """
 class BinaryConstraint:
+	symmetric = False # True when swapping var1 and var2 gives the same constraint
+
 	def __init__(self, var1, var2):
 		self.var1 = var1
 		self.var2 = var2
@@ -67,21 +84,353 @@ class BinaryConstraint:
 			return self.var2
 		return self.var1
 
+	def isSatisfiedFor(self, var, value, otherValue):
+		"""
+		isSatisfied with the arguments put in constraint order, given the value of var and of the other variable.
+		"""
+		if var == self.var1:
+			return self.isSatisfied(value, otherValue)
+		return self.isSatisfied(otherValue, value)
+
+	def unsupportedValues(self, var, domain, otherDomain):
+		"""
+		The values in domain, the domain of var, that no value in otherDomain satisfies this constraint with.
+		Subclasses with a faster way to find them than trying every pair override this.
+		"""
+		return [value for value in domain if not any(self.isSatisfiedFor(var, value, otherValue) for otherValue in otherDomain)]
+
 
 """
 	Implementation of BinaryConstraint
 	Satisfied if both values assigned are different
 """
 class NotEqualConstraint(BinaryConstraint):
+	symmetric = True
+
 	def isSatisfied(self, value1, value2):
 		if value1 == value2:
 			return False
 		return True
 
+	def unsupportedValues(self, var, domain, otherDomain):
+		# a value only loses its support when the other variable is down to that same value
+		if len(otherDomain) != 1:
+			return []
+		for otherValue in otherDomain:
+			return [otherValue] if otherValue in domain else []
+
 	def __repr__(self):
 	    return 'BadValueConstraint (%s, %s)' % (str(self.var1), str(self.var2))
 
 
+"""
+	Implementation of BinaryConstraint
+	Satisfied if the pair of values is one of the allowed tuples
+	Tuples can be given as pairs or, as in CSP files, as "value1,value2" strings. Each value of either
+	variable maps to a bitset (an int with bit i set for tuple i) of the tuples it appears in, so finding
+	unsupported values takes bitwise operations instead of pairwise checks.
+"""
+class TableConstraint(BinaryConstraint):
+	def __init__(self, var1, var2, *tuples):
+		self.var1 = var1
+		self.var2 = var2
+		pairs = set()
+		for pair in tuples:
+			if isinstance(pair, str):
+				pair = pair.split(',')
+			value1, value2 = pair
+			pairs.add((value1, value2))
+		self.tuples = sorted(pairs, key=repr) # canonical order, whatever order the tuples were listed in
+		self._supports1, self._supports2 = {}, {}
+		for i, pair in enumerate(self.tuples):
+			self._supports1[pair[0]] = self._supports1.get(pair[0], 0) | (1 << i)
+			self._supports2[pair[1]] = self._supports2.get(pair[1], 0) | (1 << i)
+
+	def isSatisfied(self, value1, value2):
+		return self._supports1.get(value1, 0) & self._supports2.get(value2, 0) != 0
+
+	def unsupportedValues(self, var, domain, otherDomain):
+		if var == self.var1:
+			own, other = self._supports1, self._supports2
+		else:
+			own, other = self._supports2, self._supports1
+		valid = 0 # the tuples still possible given otherDomain
+		for otherValue in otherDomain:
+			valid |= other.get(otherValue, 0)
+		return [value for value in domain if not own.get(value, 0) & valid]
+
+	def __repr__(self):
+		return 'TableConstraint (%s, %s) {%d tuples}' % (str(self.var1), str(self.var2), len(self.tuples))
+
+
+"""
+	A domain of integers stored as sorted, disjoint, non-adjacent inclusive intervals, for problems whose
+	domains are long runs such as timeslots. It behaves like the set domains used elsewhere (len, in, iteration,
+	add, remove, discard, difference_update, intersection_update, copy) but never holds the values themselves:
+	membership and the search for the interval to change are binary searches over the interval starts. An add
+	or remove that splits or joins intervals inserts into or deletes from those lists, so it costs O(k) for k
+	intervals; changing an interval's end, and every membership test, costs O(log k).
+	Args:
+		intervals (iterable<tuple<int, int>>): (low, high) pairs, both ends included, in any order and may overlap
+"""
+class IntervalDomain:
+	__hash__ = None # mutable, like set
+
+	def __init__(self, intervals=()):
+		self.starts = []
+		self.ends = []
+		self.size = 0
+		for low, high in sorted((low, high) for low, high in intervals if low <= high):
+			if self.ends and low <= self.ends[-1] + 1: # overlaps or touches the previous interval
+				if high > self.ends[-1]:
+					self.size += high - self.ends[-1]
+					self.ends[-1] = high
+			else:
+				self.starts.append(low)
+				self.ends.append(high)
+				self.size += high - low + 1
+
+	@classmethod
+	def fromValues(cls, values):
+		"""
+		The domain holding exactly the given integers, runs of consecutive values becoming one interval.
+		"""
+		return cls((value, value) for value in values)
+
+	def intervals(self):
+		return list(zip(self.starts, self.ends))
+
+	def copy(self):
+		domain = IntervalDomain()
+		domain.starts = list(self.starts)
+		domain.ends = list(self.ends)
+		domain.size = self.size
+		return domain
+
+	def _find(self, value):
+		"""
+		Index of the interval holding value, or -1.
+		"""
+		i = bisect.bisect_right(self.starts, value) - 1
+		if i >= 0 and value <= self.ends[i]:
+			return i
+		return -1
+
+	def __len__(self):
+		return self.size
+
+	def __contains__(self, value):
+		try:
+			return self._find(value) >= 0
+		except TypeError: # not comparable with integers, so never a member
+			return False
+
+	def __iter__(self):
+		for low, high in self.intervals(): # a snapshot, so the domain may change while iterating
+			for value in range(low, high + 1):
+				yield value
+
+	def __eq__(self, other):
+		if isinstance(other, IntervalDomain):
+			return self.starts == other.starts and self.ends == other.ends
+		return len(self) == len(other) and all(value in self for value in other)
+
+	def __ne__(self, other):
+		return not self == other
+
+	def add(self, value):
+		i = bisect.bisect_right(self.starts, value) - 1
+		if i >= 0 and value <= self.ends[i]:
+			return
+		joinsLeft = i >= 0 and self.ends[i] == value - 1
+		joinsRight = i + 1 < len(self.starts) and self.starts[i + 1] == value + 1
+		if joinsLeft and joinsRight: # fills the gap between two intervals
+			self.ends[i] = self.ends[i + 1]
+			del self.starts[i + 1]
+			del self.ends[i + 1]
+		elif joinsLeft:
+			self.ends[i] = value
+		elif joinsRight:
+			self.starts[i + 1] = value
+		else:
+			self.starts.insert(i + 1, value)
+			self.ends.insert(i + 1, value)
+		self.size += 1
+
+	def remove(self, value):
+		i = self._find(value)
+		if i < 0:
+			raise KeyError(value)
+		low, high = self.starts[i], self.ends[i]
+		if low == high:
+			del self.starts[i]
+			del self.ends[i]
+		elif value == low:
+			self.starts[i] = value + 1
+		elif value == high:
+			self.ends[i] = value - 1
+		else: # splits the interval in two
+			self.ends[i] = value - 1
+			self.starts.insert(i + 1, value + 1)
+			self.ends.insert(i + 1, high)
+		self.size -= 1
+
+	def discard(self, value):
+		if value in self:
+			self.remove(value)
+
+	def difference(self, other):
+		"""
+		The values of this domain that are not in the IntervalDomain other, found by sweeping both interval lists.
+		"""
+		kept = []
+		j = 0
+		for low, high in zip(self.starts, self.ends):
+			while j < len(other.starts) and other.ends[j] < low:
+				j += 1
+			k = j
+			while low <= high and k < len(other.starts) and other.starts[k] <= high:
+				if other.starts[k] > low:
+					kept.append((low, other.starts[k] - 1))
+				low = other.ends[k] + 1
+				k += 1
+			if low <= high:
+				kept.append((low, high))
+		return IntervalDomain(kept)
+
+	def difference_update(self, values):
+		if isinstance(values, IntervalDomain):
+			self.__init__(self.difference(values).intervals())
+			return
+		for value in list(values):
+			self.discard(value)
+
+	def intersection_update(self, values):
+		if not isinstance(values, IntervalDomain):
+			values = IntervalDomain.fromValues(value for value in values if value in self)
+		kept = []
+		j = 0
+		for low, high in zip(self.starts, self.ends):
+			while j < len(values.starts) and values.ends[j] < low:
+				j += 1
+			k = j
+			while k < len(values.starts) and values.starts[k] <= high:
+				kept.append((max(low, values.starts[k]), min(high, values.ends[k])))
+				k += 1
+		self.__init__(kept)
+
+	def __repr__(self):
+		return 'IntervalDomain(%s)' % ', '.join('%d..%d' % pair for pair in zip(self.starts, self.ends))
+
+
+"""
+	Values of an IntervalDomain in a chosen order, as a run of (low, high) segments that is only expanded one
+	value at a time. Besides len, iteration, indexing and in, it has the list operations callers of a value
+	ordering use (remove, insert, pop), so it can stand in for the lists that orderValues and
+	leastConstrainingValuesHeuristic return. Popping from the front, as a search working through the values
+	does, takes constant time.
+	Args:
+		segments (list<tuple<int, int>>): the (low, high) runs, both ends included, in the order to try them
+"""
+class IntervalValues:
+	def __init__(self, segments):
+		self.segments = [(low, high) for low, high in segments if low <= high]
+		self.size = sum(high - low + 1 for low, high in self.segments)
+		self._offsets = None # position of each segment's first value, rebuilt after a change
+
+	def offsets(self):
+		if self._offsets is None:
+			self._offsets = [0]
+			for low, high in self.segments:
+				self._offsets.append(self._offsets[-1] + high - low + 1)
+		return self._offsets
+
+	def _locate(self, index):
+		"""
+		(segment number, value) at position index, counting from the end if negative.
+		"""
+		if index < 0:
+			index += self.size
+		if not 0 <= index < self.size:
+			raise IndexError(index)
+		offsets = self.offsets()
+		i = bisect.bisect_right(offsets, index) - 1
+		return i, self.segments[i][0] + index - offsets[i]
+
+	def _cut(self, i, value):
+		"""
+		Takes value out of segment i.
+		"""
+		low, high = self.segments[i]
+		if low == high:
+			del self.segments[i]
+		elif value == low:
+			self.segments[i] = (low + 1, high)
+		elif value == high:
+			self.segments[i] = (low, high - 1)
+		else:
+			self.segments[i:i + 1] = [(low, value - 1), (value + 1, high)]
+		self.size -= 1
+		self._offsets = None
+
+	def __len__(self):
+		return self.size
+
+	def __iter__(self):
+		for low, high in list(self.segments):
+			for value in range(low, high + 1):
+				yield value
+
+	def __getitem__(self, index):
+		return self._locate(index)[1]
+
+	def __contains__(self, value):
+		return any(low <= value <= high for low, high in self.segments)
+
+	def remove(self, value):
+		for i, (low, high) in enumerate(self.segments):
+			if low <= value <= high:
+				self._cut(i, value)
+				return
+		raise ValueError('%r is not in the values' % (value,))
+
+	def pop(self, index=-1):
+		if index == 0 and self.segments: # the common case, kept cheap
+			value = self.segments[0][0]
+			self._cut(0, value)
+			return value
+		i, value = self._locate(index)
+		self._cut(i, value)
+		return value
+
+	def insert(self, index, value):
+		if index < 0:
+			index = max(0, index + self.size)
+		index = min(index, self.size)
+		offsets = self.offsets()
+		i = bisect.bisect_right(offsets, index) - 1
+		if i < len(self.segments) and offsets[i] < index: # inside a segment, so split it there
+			low, high = self.segments[i]
+			middle = low + index - offsets[i]
+			self.segments[i:i + 1] = [(low, middle - 1), (value, value), (middle, high)]
+		else:
+			self.segments.insert(i, (value, value))
+		self.size += 1
+		self._offsets = None
+
+	def __repr__(self):
+		return 'IntervalValues(%s)' % ', '.join('%d..%d' % pair for pair in self.segments)
+
+
+"""
+	Copies a domain for a new problem or assignment, keeping interval domains in interval form.
+"""
+def copyDomain(domain):
+	if isinstance(domain, IntervalDomain):
+		return domain.copy()
+	return set(domain)
+
+
 class ConstraintSatisfactionProblem:
 	"""
 	Structure of a constraint satisfaction problem.
@@ -89,16 +438,22 @@ class ConstraintSatisfactionProblem:
 	varDomains is a dictionary mapping variables to possible domains.
 	Args:
 		variables (list<string>): a list of variable names
-		domains (list<set<value>>): a list of sets of domains for each variable
+		domains (list<set<value>>): a list of sets of domains for each variable; IntervalDomains are kept as they are
 		binaryConstraints (list<BinaryConstraint>): a list of binary constraints to satisfy
 		unaryConstraints (list<BinaryConstraint>): a list of unary constraints to satisfy
 	"""
 	def __init__(self, variables, domains, binaryConstraints = [], unaryConstraints = []):
 		self.varDomains = {}
-		self.variables: variables = variables
-		self.varDomains: dict[variables, dict[domains]] = domains
+		self.variables: variables = list(variables)
+		if isinstance(domains, dict): # already keyed by variable
+			domains = [domains[var] for var in self.variables]
+		for var, domain in zip(self.variables, domains): # pair each variable with its domain, in order
+			self.varDomains[var] = copyDomain(domain)
 		self.binaryConstraints = binaryConstraints
 		self.unaryConstraints = unaryConstraints
+		self.unaryByVariable = {} # variable -> the unary constraints on it
+		for constraint in unaryConstraints:
+			self.unaryByVariable.setdefault(constraint.var, []).append(constraint)
 
 	def __repr__(self):
 	    return '---Variable Domains\n%s---Binary Constraints\n%s---Unary Constraints\n%s' % ( \
@@ -118,7 +473,7 @@ class Assignment:
 	def __init__(self, csp):
 		self.varDomains = {}
 		for var in csp.varDomains:
-			self.varDomains[var] = set(csp.varDomains[var])
+			self.varDomains[var] = copyDomain(csp.varDomains[var])
 		self.assignedValues = { var: None for var in self.varDomains }
 
 	"""
@@ -153,8 +508,39 @@ class Assignment:
 	def extractSolution(self):
 		if not self.isComplete():
 			return None
+		if isinstance(self.assignedValues, Layer): # a forked assignment hands out a plain dictionary
+			return dict(self.assignedValues.items())
 		return self.assignedValues
 
+	"""
+	The current domain of var for reading only. Unlike varDomains[var] it never copies the domain of a
+	forked assignment, so inferences and heuristics that only look at a domain use this.
+	Args:
+		var (string): the variable whose domain is read
+	Returns:
+		set<value>
+		the domain, which must not be changed through this reference
+	"""
+	def domain(self, var):
+		domains = self.varDomains
+		if isinstance(domains, DomainLayer):
+			return domains.peek(var)
+		return domains[var]
+
+	"""
+	Forks this assignment in constant time, for searches started many times from the same state, such as the
+	domains after AC3. This assignment and the fork both layer their changes over the current domains and
+	assigned values, and a domain is copied only when one of them changes it.
+	Returns:
+		Assignment
+		a new assignment with the same domains and assigned values
+	"""
+	def fork(self):
+		child = Assignment.__new__(Assignment)
+		self.varDomains, child.varDomains = splitLayer(self.varDomains, DomainLayer)
+		self.assignedValues, child.assignedValues = splitLayer(self.assignedValues, Layer)
+		return child
+
 	def __repr__(self):
 	    return '---Variable Domains\n%s---Assigned Values\n%s' % ( \
 	        ''.join([str(e) + ':' + str(self.varDomains[e]) + '\n' for e in self.varDomains]), \
@@ -162,9 +548,184 @@ class Assignment:
 
 
 
+"""
+	A mapping layered over a base mapping that nobody changes any more, as a forked Assignment uses for its
+	assigned values. Writes go to this layer's own entries; reads fall through to the base, walking down any
+	layers below it once per key and remembering what they found, so forking never copies the base.
+	Args:
+		base (dictionary or Layer): the entries shared with other forks
+"""
+class Layer:
+	def __init__(self, base):
+		self.base = base
+		self.own = {} # key -> the entry written to this layer
+		self.shared = {} # key -> the entry read through from the base, which never changes
+		if isinstance(base, Layer):
+			self.root, self.extra = base.root, base.extra
+		else:
+			self.root, self.extra = base, ()
+		# keys are those of the root plus any added since, kept as a tuple so layers can share it
+
+	def peek(self, key):
+		"""
+		The entry for key, read without copying it.
+		"""
+		if key in self.own:
+			return self.own[key]
+		if key in self.shared:
+			return self.shared[key]
+		layer = self.base
+		while isinstance(layer, Layer):
+			if key in layer.own:
+				value = layer.own[key]
+				break
+			if key in layer.shared:
+				value = layer.shared[key]
+				break
+			layer = layer.base
+		else:
+			value = layer[key]
+		self.shared[key] = value
+		return value
+
+	def __getitem__(self, key):
+		return self.peek(key)
+
+	def __setitem__(self, key, value):
+		if key not in self.root and key not in self.extra:
+			self.extra = self.extra + (key,)
+		self.own[key] = value
+
+	def __contains__(self, key):
+		return key in self.root or key in self.extra
+
+	def __iter__(self):
+		for key in self.root:
+			yield key
+		for key in self.extra:
+			yield key
+
+	def __len__(self):
+		return len(self.root) + len(self.extra)
+
+	def keys(self):
+		return list(self)
+
+	def items(self):
+		return [(key, self.peek(key)) for key in self]
+
+	def values(self):
+		return [self.peek(key) for key in self]
+
+	def get(self, key, default=None):
+		if key in self:
+			return self[key]
+		return default
+
+	def __repr__(self):
+		return repr(dict(self.items()))
+
+
+"""
+	Copy-on-write domains of a forked Assignment, used as its varDomains dictionary.
+	Looking a domain up by variable (domains[var]) is how the search changes it, so that copies the domain into
+	this layer the first time and later changes stay in this fork. Reads that must not copy go through peek,
+	Assignment.domain, items() or values().
+	Args:
+		base (dictionary<string, set<value>>): the domains shared with other forks, which no fork changes
+"""
+class DomainLayer(Layer):
+	def __getitem__(self, var):
+		if var in self.own:
+			return self.own[var]
+		domain = copyDomain(self.peek(var))
+		self.own[var] = domain
+		return domain
+
+
+"""
+	Puts a mapping of an assignment being forked under two new layers, one for each side of the fork. A layer
+	with no writes of its own since it was made already shares its base unchanged, so that base is reused
+	rather than stacking another layer on top.
+	Args:
+		mapping (dictionary or Layer): the domains or assigned values of the assignment being forked
+		layerClass (class): Layer or DomainLayer
+	Returns:
+		tuple<Layer, Layer>
+		the layers for the assignment itself and for its fork
+"""
+def splitLayer(mapping, layerClass):
+	if type(mapping) is layerClass and len(mapping.own) == 0:
+		return mapping, layerClass(mapping.base)
+	return layerClass(mapping), layerClass(mapping)
+
+
 ####################################################################################################
 
 
+class SearchStatistics:
+	"""
+	Counters collected by the search engine while solve runs with statistics enabled.
+	onNode, if given, is called as onNode(var, value, depth, assignment) every time a value is tried.
+	Args:
+		onNode (function): optional per-node hook for custom profilers
+	"""
+	def __init__(self, onNode=None):
+		self.nodes = 0 # values tried on a variable
+		self.backtracks = 0 # values undone after their subtree failed
+		self.consistencyChecks = 0 # calls to consistent
+		self.reviseCalls = 0 # calls to revise
+		self.wipeouts = 0 # domains emptied by inference
+		self.depth = 0
+		self.maxDepth = 0
+		self.heuristicTime = {} # method name -> wall seconds spent in it
+		self.preprocessingRemoved = {} # preprocessing step name -> domain values it removed
+		self.kernelRemoved = 0 # variables peeled off by the low-degree kernel
+		self.totalTime = 0.0
+		self.onNode = onNode
+
+	def timed(self, method):
+		"""
+		Wraps a heuristic or inference method so that its wall time is added to heuristicTime.
+		"""
+		name = method.__name__
+		self.heuristicTime.setdefault(name, 0.0)
+		def timedMethod(*args):
+			start = time.perf_counter()
+			try:
+				return method(*args)
+			finally:
+				self.heuristicTime[name] += time.perf_counter() - start
+		timedMethod.__name__ = name
+		return timedMethod
+
+	def asDict(self):
+		return {
+			'nodes': self.nodes, 'backtracks': self.backtracks,
+			'consistencyChecks': self.consistencyChecks, 'reviseCalls': self.reviseCalls,
+			'wipeouts': self.wipeouts, 'maxDepth': self.maxDepth,
+			'heuristicTime': dict(self.heuristicTime), 'totalTime': self.totalTime,
+			'preprocessingRemoved': dict(self.preprocessingRemoved), 'kernelRemoved': self.kernelRemoved,
+		}
+
+	def __repr__(self):
+		return 'SearchStatistics %s' % str(self.asDict())
+
+
+# statistics of the solve currently running, None when instrumentation is off
+_statistics = None
+
+
+def _enterNode(var, value, assignment):
+	_statistics.nodes += 1
+	_statistics.depth += 1
+	if _statistics.depth > _statistics.maxDepth:
+		_statistics.maxDepth = _statistics.depth
+	if _statistics.onNode is not None:
+		_statistics.onNode(var, value, _statistics.depth, assignment)
+
+
+
 """
 	Checks if a value assigned to a variable is consistent with all binary constraints in a problem.
 	Do not assign value to var. Only check if this value would be consistent or not.
@@ -179,15 +740,58 @@ class Assignment:
 		True if the value would be consistent with all currently assigned values, False otherwise
 """
 def consistent(assignment, csp, var, value):
+	if _statistics is not None:
+		_statistics.consistencyChecks += 1
 	currentBinaryConstraints = csp.binaryConstraints #stores the current binary constraints of passed constraint satisfaction problem
 	for constraint in currentBinaryConstraints: #index through every constraint in current binary constraints
 		isAffected = constraint.affects(var) # bool if constraint has an impact on variable
 		if(isAffected): # if the constraint has an impact on the variable
-			if(value == assignment.assignedValues[constraint.otherVariable(var)]): #if current value remains consistent with all other assignments
+			otherValue = assignment.assignedValues[constraint.otherVariable(var)] # value of the other variable, None if unassigned
+			if(otherValue != None and not constraint.isSatisfiedFor(var, value, otherValue)): #if current value breaks the constraint with the other assignment
 				return False # false if not
 	return True # true if so
 
 
+"""
+	Checks a complete solution against every domain, unary and binary constraint of a problem.
+	Args:
+		csp (ConstraintSatisfactionProblem): the problem definition
+		solution (dictionary<string, value>): a map from variables to their assigned values
+	Returns:
+		list
+		the violated constraints, with ('domain', var) for missing or out-of-domain values. Empty if the solution is valid.
+"""
+def violatedConstraints(csp, solution):
+	violations = []
+	for var in csp.varDomains:
+		if var not in solution or solution[var] not in csp.varDomains[var]: # every variable needs a value from its own domain
+			violations.append(('domain', var))
+	for constraint in csp.unaryConstraints:
+		if constraint.var in solution and not constraint.isSatisfied(solution[constraint.var]):
+			violations.append(constraint)
+	for constraint in csp.binaryConstraints:
+		if constraint.var1 in solution and constraint.var2 in solution and \
+				not constraint.isSatisfied(solution[constraint.var1], solution[constraint.var2]):
+			violations.append(constraint)
+	return violations
+
+
+"""
+	Groups the binary constraints of a problem by the variables they connect.
+	Args:
+		csp (ConstraintSatisfactionProblem): the problem definition
+	Returns:
+		dictionary<string, list<tuple<string, BinaryConstraint>>>
+		a map from each variable to (neighbour, constraint) pairs, one per constraint on it
+"""
+def constraintNeighbours(csp):
+	neighbours = { var: [] for var in csp.varDomains }
+	for constraint in csp.binaryConstraints:
+		neighbours.setdefault(constraint.var1, []).append((constraint.var2, constraint))
+		neighbours.setdefault(constraint.var2, []).append((constraint.var1, constraint))
+	return neighbours
+
+
 """
 	Recursive backtracking algorithm.
 	A new assignment should not be created. The assignment passed in should have its domains updated with inferences.
@@ -224,12 +828,17 @@ def recursiveBacktracking(assignment, csp, orderValuesMethod, selectVariableMeth
 			if(consistent(assignment, csp, currentVariable, currentValue)):
 				# PSEUDOCODE: add {var = value} to assignment
 				assignment.assignedValues[currentVariable] = currentValue # adds the current value at the current variable to the assigned values
+				if _statistics is not None:
+					_enterNode(currentVariable, currentValue, assignment)
 				# PSEUDOCODE:  result <-- BACKTRACK(assignent, csp)
 				recursiveProduct = recursiveBacktracking(assignment, csp, orderValuesMethod, selectVariableMethod)
 				# PSEUDOCODE: if result != failure then
 				if (recursiveProduct != None):
 					# PSEUDOCODE: return result
 					return recursiveProduct
+				if _statistics is not None:
+					_statistics.depth -= 1
+					_statistics.backtracks += 1
 				# PSEUDOCODE: remove {var = value} from assignment
 				assignment.assignedValues[currentVariable] = None
 	return None # no solution exists
@@ -237,6 +846,8 @@ def recursiveBacktracking(assignment, csp, orderValuesMethod, selectVariableMeth
 
 """
 	Uses unary constraints to eleminate values from an assignment.
+	Unary constraints are looked up per variable in csp.unaryByVariable. Variables left with a single
+	value are then revised into their neighbours, and so on for any neighbour that becomes pinned.
 	Args:
 		assignment (Assignment): a partial assignment to expand upon
 		csp (ConstraintSatisfactionProblem): the problem definition
@@ -246,13 +857,31 @@ def recursiveBacktracking(assignment, csp, orderValuesMethod, selectVariableMeth
 """
 def eliminateUnaryConstraints(assignment, csp):
 	domains = assignment.varDomains
-	for var in domains:
-		for constraint in (c for c in csp.unaryConstraints if c.affects(var)):
-			for value in (v for v in list(domains[var]) if not constraint.isSatisfied(v)):
-				domains[var].remove(value)
-				if len(domains[var]) == 0:
-				 	# Failure due to invalid assignment
-				 	return None
+	pinned = deque()
+	for var, constraints in csp.unaryByVariable.items():
+		if var not in domains: # constraints on unknown variables are ignored, as they always were
+			continue
+		for constraint in constraints:
+			constraint.filterDomain(domains[var])
+			if len(domains[var]) == 0:
+			 	# Failure due to invalid assignment
+			 	return None
+		if len(domains[var]) == 1:
+			pinned.append(var)
+
+	# a pinned variable's value can be removed from its neighbours straight away
+	if pinned:
+		neighbours = constraintNeighbours(csp)
+		while len(pinned) > 0:
+			var = pinned.popleft()
+			for other, constraint in neighbours[var]:
+				if other == var:
+					continue
+				lengthBefore = len(assignment.domain(other))
+				if revise(assignment, csp, var, other, constraint) == None:
+					return None
+				if lengthBefore > 1 and len(assignment.domain(other)) == 1: # newly pinned, pass it on
+					pinned.append(other)
 	return assignment
 
 
@@ -290,9 +919,9 @@ def minimumRemainingValuesHeuristic(assignment, csp):
 			if (nextVar == None): # if nextVar unintialized or nextVar is nothing
 				nextVar = currentVariable # set the next up variable to current variable
 			else: # if it is not None
-				if (len(domains[nextVar]) > len(currentDomain)): # if the length of the domain of the next variable is greater than that of the current variable
+				if (len(assignment.domain(nextVar)) > len(currentDomain)): # if the length of the domain of the next variable is greater than that of the current variable
 					nextVar = currentVariable # set next variable to current variable
-				elif (len(domains[nextVar]) == len(currentDomain)): # if the lengths are equal
+				elif (len(assignment.domain(nextVar)) == len(currentDomain)): # if the lengths are equal
 					if (currentVariable != nextVar): # and if they are not the same variable
 						for cspBinaryConstraint in csp.binaryConstraints: # index through all binary constraints of the problem
 							if cspBinaryConstraint.affects(currentVariable): # if the current binary constraint affects the current variable
@@ -309,7 +938,61 @@ def minimumRemainingValuesHeuristic(assignment, csp):
 	Uses no heuristics.
 """
 def orderValues(assignment, csp, var):
-	return list(assignment.varDomains[var])
+	domain = assignment.domain(var)
+	if isinstance(domain, IntervalDomain): # keep the runs instead of listing every value
+		return IntervalValues(domain.intervals())
+	return list(domain)
+
+
+"""
+	Checks whether every binary constraint of a problem is a NotEqualConstraint, as in map colouring.
+"""
+def onlyNotEqualConstraints(csp):
+	for constraint in csp.binaryConstraints:
+		if not isinstance(constraint, NotEqualConstraint):
+			return False
+	return True
+
+
+"""
+	Checks whether the values of a problem are fully interchangeable, as the colours of a map are:
+	every binary constraint is a NotEqualConstraint, there are no unary constraints and all domains are identical.
+	Args:
+		csp (ConstraintSatisfactionProblem): the problem description
+	Returns:
+		boolean
+		True if any permutation of the values maps solutions to solutions, False otherwise
+"""
+def hasInterchangeableValues(csp):
+	if csp.unaryConstraints or not onlyNotEqualConstraints(csp):
+		return False
+	domains = list(csp.varDomains.values())
+	return all(domain == domains[0] for domain in domains)
+
+
+"""
+	Wraps a value ordering to break the symmetry of interchangeable values dynamically.
+	A variable may take any value already used by an assigned variable, but only one value that is still unused,
+	since every unused value leads to an equivalent subtree. Only valid when hasInterchangeableValues(csp) is True.
+	Args:
+		orderValuesMethod (function<assignment, csp, variable> returns list<value>): the ordering to wrap
+	Returns:
+		function<assignment, csp, variable> returns list<value>
+"""
+def breakValueSymmetry(orderValuesMethod):
+	def orderValuesBreakingSymmetry(assignment, csp, var):
+		usedValues = set(assignment.assignedValues.values()) # values some variable already holds
+		values = [] # values to try, in the wrapped order
+		tookUnused = False # whether the one unused value has been taken yet
+		for value in orderValuesMethod(assignment, csp, var):
+			if value in usedValues:
+				values.append(value)
+			elif not tookUnused:
+				values.append(value)
+				tookUnused = True
+		return values
+	orderValuesBreakingSymmetry.__name__ = orderValuesMethod.__name__
+	return orderValuesBreakingSymmetry
 
 
 """
@@ -329,7 +1012,9 @@ def leastConstrainingValuesHeuristic(assignment, csp, var):
 # examine its values. For this,the least-constraining-value heuristic can be effective in some
 # cases. It prefers the value that rules out the fewest choices for the neighboring variables in
 # the constraint graph.
-	values = list(assignment.varDomains[var]) # pulls the assignments domain for the passed variable and stores in a list
+	if isinstance(assignment.domain(var), IntervalDomain): # count per run of values rather than per value
+		return intervalLeastConstrainingValues(assignment, csp, var)
+	values = list(assignment.domain(var)) # pulls the assignments domain for the passed variable and stores in a list
 	binaryVariables, masterConstraints, resultant = list(), list(), list() # initializes 3 lists
 	return lcvSorterHelper(assignment, csp, var, values, binaryVariables, masterConstraints, resultant) # returns value of helper function
 
@@ -345,7 +1030,7 @@ def lcvSorterHelper(assignment, csp, var, values, binaryVariables, masterConstra
 	for currentValue in values: # for all values in the assigned domain of passed variable
 		sum = 0 # sum value initialized to 0
 		for currentVariable in binaryVariables: # for all vaariables found that are not empty and affect binaryConstraints
-			if (currentValue != None and currentValue in assignment.varDomains[currentVariable]): # if the current value is in the domain of the current variable
+			if (currentValue != None and currentValue in assignment.domain(currentVariable)): # if the current value is in the domain of the current variable
 				sum += 1 # increase sum
 		masterConstraints.append((sum,currentValue)) # add the couple of the currently found value and the total sum of all of its dependents
 	masterConstraints.sort(key = lambda list: list[SUM_INDEX]) # sort the master constraints by order of their sum. Use of lamba key creates anonmyous function, referenced at this URL: https://www.w3schools.com/python/ref_list_sort.asp
@@ -353,6 +1038,47 @@ def lcvSorterHelper(assignment, csp, var, values, binaryVariables, masterConstra
 		resultant.append(currentList[VALUE_INDEX]) # add all values to the resultant list
 	return resultant # return final list of just values
 #-----------------------------------END OF lcvSorterHelper--------------------------------------------------------------------------------------------------------------------------
+
+"""
+	The least constraining value ordering for a variable with an IntervalDomain. The number of neighbouring
+	domains holding a value only changes where one of those domains starts or ends a run, so the variable's
+	runs are cut at those points and the pieces sorted by their count, ties kept in increasing value order.
+	Args:
+		assignment (Assignment): the partial assignment to expand
+		csp (ConstraintSatisfactionProblem): the problem description
+		var (string): the variable to be assigned the values
+	Returns:
+		IntervalValues
+		the possible values ordered as leastConstrainingValuesHeuristic orders them
+"""
+def intervalLeastConstrainingValues(assignment, csp, var):
+	domain = assignment.domain(var)
+	changes = {} # value -> change in the count of neighbouring domains holding it, from that value on
+	for cspBinaryConstraint in csp.binaryConstraints:
+		if cspBinaryConstraint.affects(var):
+			otherDomain = assignment.domain(cspBinaryConstraint.otherVariable(var))
+			if isinstance(otherDomain, IntervalDomain):
+				runs = zip(otherDomain.starts, otherDomain.ends)
+			else: # a set domain counts value by value
+				runs = [(value, value) for value in otherDomain if value in domain]
+			for low, high in runs:
+				changes[low] = changes.get(low, 0) + 1
+				changes[high + 1] = changes.get(high + 1, 0) - 1
+	points = sorted(changes)
+	pieces = [] # (count, low, high)
+	count, i = 0, 0
+	for low, high in zip(domain.starts, domain.ends):
+		while i < len(points) and points[i] <= low: # changes up to the start of this run
+			count += changes[points[i]]
+			i += 1
+		while i < len(points) and points[i] <= high: # changes inside it cut it
+			pieces.append((count, low, points[i] - 1))
+			low = points[i]
+			count += changes[points[i]]
+			i += 1
+		pieces.append((count, low, high))
+	pieces.sort(key = lambda piece: piece[0]) # stable, so equal counts stay in value order
+	return IntervalValues((low, high) for count, low, high in pieces)
 """
 	Trivial method for making no inferences.
 """
@@ -384,22 +1110,26 @@ def forwardChecking(assignment, csp, var, value):
 	# arc consistency as a preprocessing step
 	inferences = set([]) # intializes set of inferences
 	domains = assignment.varDomains # grabs all doains from passed assignment
-	seenVariables = list() # initalizes list to store all seen variables
 	for cspBinaryConstraint in csp.binaryConstraints: # for all binary constraints in csp
 		if(cspBinaryConstraint.affects(var)): # if this binary constraint affects this variable
-			if (assignment.assignedValues[cspBinaryConstraint.otherVariable(var)] != None): # if assigned values at variable are not equal to None
+			otherVariable = cspBinaryConstraint.otherVariable(var) # the variable on the other end of the constraint
+			if (assignment.assignedValues[otherVariable] != None): # if assigned values at variable are not equal to None
 				continue # skip iteration
-			else: # if it is None
-				swap = list(domains[cspBinaryConstraint.otherVariable(var)]) # creates list to swap out variables affected by constraints
-				if value in swap: # if passed value is in the swap list
-					if (len(swap) == 1): # if # of domain variables is 1
-						for currentVariable in seenVariables: # for all seen variables
-							assignment.varDomains[currentVariable].add(value) # adds var/value to domain assignment
-						return None # returns none since length is 1
-					else: # if greater than 1
-						seenVariables.append(cspBinaryConstraint.otherVariable(var))
-						inferences.add((cspBinaryConstraint.otherVariable(var),value))
-						domains[cspBinaryConstraint.otherVariable(var)].remove(value)
+			if isinstance(cspBinaryConstraint, NotEqualConstraint): # only the passed value itself can lose its support
+				removed = [value] if value in assignment.domain(otherVariable) else []
+			else: # any other constraint works out which values lose their support
+				removed = cspBinaryConstraint.unsupportedValues(otherVariable, assignment.domain(otherVariable), (value,))
+			if len(removed) == 0: # nothing to prune
+				continue
+			if (len(removed) == len(assignment.domain(otherVariable))): # if the whole domain would go
+				for inferredVariable, inferredValue in inferences: # undo everything pruned so far
+					domains[inferredVariable].add(inferredValue)
+				if _statistics is not None:
+					_statistics.wipeouts += 1
+				return None # returns none since the domain is wiped out
+			for removedValue in removed: # otherwise prune and remember each value
+				inferences.add((otherVariable, removedValue))
+				domains[otherVariable].remove(removedValue)
 	return inferences # return updated inferences
 
 """
@@ -444,12 +1174,17 @@ def recursiveBacktrackingWithInferences(assignment, csp, orderValuesMethod, sele
 					continue # skip iteration
 				# PSEUDOCODE: add {var = value} to assignment
 				assignment.assignedValues[currentVariable] = currentValue # adds the current value at the current variable to the assigned values
+				if _statistics is not None:
+					_enterNode(currentVariable, currentValue, assignment)
 				# PSEUDOCODE:  result <-- BACKTRACK(assignent, csp)
 				recursiveProduct = recursiveBacktrackingWithInferences(assignment, csp, orderValuesMethod, selectVariableMethod, inferenceMethod)
 				# PSEUDOCODE: if result != failure then
 				if (recursiveProduct != None):
 					# PSEUDOCODE: return result
 					return recursiveProduct
+				if _statistics is not None:
+					_statistics.depth -= 1
+					_statistics.backtracks += 1
 				# PSEUDOCODE: add inferences to assignment
 				for (currentInferenceVariable,currentInferenceValue) in inferenceList: # for all values & variables in inference list
 					assignment.varDomains[currentInferenceVariable].add(currentInferenceValue) # add to assignment
@@ -477,27 +1212,26 @@ def recursiveBacktrackingWithInferences(assignment, csp, orderValuesMethod, sele
 		the inferences made in this call or None if inconsistent assignment
 """
 def revise(assignment, csp, var1, var2, constraint):
+	if _statistics is not None:
+		_statistics.reviseCalls += 1
 	inferences = set([]) # intializes inferences to empty set
 	VARIABLE_INDEX = 0 # const for index of variable in inference list couple
 	VALUE_INDEX = 1 # const for index of value in inference list couple
 	passedVar1 = var1 # for sake of naming conventions
 	passedVar2 = var2 # for sake of naming conventions
-	domain1 = assignment.varDomains[passedVar1] # stores domain from var 1
-	domain2 = assignment.varDomains[passedVar2] # stores domain from var 2
+	domain1 = assignment.domain(passedVar1) # stores domain from var 1, read only
+	domain2 = assignment.domain(passedVar2) # stores domain from var 2, read only
 	lengthDomain2 = len(domain2) # length of 2nd domain
 
-	for currentVariable1 in domain2: # search through first variables in 2nd domain
-		satisfiedBool = False # bool value if constraint is satisfied or not, resets each iteration
-		for currentVariable2 in domain1: # search through second variables in 1st domain
-			if (constraint.isSatisfied(currentVariable1, currentVariable2) == True): # if variable 1 and 2 of this iteration satisfy the constraint
-				satisfiedBool = True # set satisfiedBool to True
-		if(satisfiedBool == False): # not satisfied, add to list of inferences
-			inferences.add((passedVar2, currentVariable1)) # update inferences
+	for currentVariable1 in constraint.unsupportedValues(passedVar2, domain2, domain1): # values of var 2 with no support left in domain 1, found the constraint's own way
+		inferences.add((passedVar2, currentVariable1)) # update inferences
 	for couples in inferences: # for all var pairs in inferences
 		assignment.varDomains[couples[VARIABLE_INDEX]].remove(couples[VALUE_INDEX]) # removes inconsistent values
-	if lengthDomain2 <= 0: # if the length of the 2nd domain is less than 1
+	if lengthDomain2 - len(inferences) <= 0: # if the 2nd domain has been emptied
 		for couples in inferences: # for all var pairs in inferences
 			assignment.varDomains[couples[VARIABLE_INDEX]].add(couples[VALUE_INDEX]) # goes through in reverse and adds to assignments
+		if _statistics is not None:
+			_statistics.wipeouts += 1
 		return None # return none if length less than 1
 	return inferences # return updated inferences
 
@@ -522,10 +1256,33 @@ def maintainArcConsistency(assignment, csp, var, value):
 	#make all the other variables arc-consistent.The algorithm called MAC (for Maintaining Arc Consistency (MAC)) detects this
 	#inconsistency
 	# follows description in ch. 6.2.2 in textbook
-	import queue # does not work ?
+	inferences = set([]) # intializes inferences to empty set
+	if value == None: # nothing to propagate
+		return inferences
+	for otherValue in list(assignment.varDomains[var]): # assigning var = value leaves only value in var's domain
+		if otherValue != value:
+			assignment.varDomains[var].remove(otherValue)
+			inferences.add((var, otherValue))
+	return propagateArcs(assignment, csp, var, inferences) # return updated inferences
+
+
+"""
+	Restores arc consistency after the domain of var has shrunk, revising every arc out of var and
+	then every arc out of each variable whose domain is reduced in turn.
+	Args:
+		assignment (Assignment): the partial assignment to expand
+		csp (ConstraintSatisfactionProblem): the problem description
+		var (string): the variable whose domain has just been reduced
+		inferences (set<tuple<variable, value>>): removals already made by the caller, undone too on failure
+	Returns:
+		set<<variable, value>>
+		inferences plus the removals made in this call or None if inconsistent assignment
+"""
+def propagateArcs(assignment, csp, var, inferences=None):
 	VARIABLE_INDEX = 0 # const for index of variable in inference list couple
 	VALUE_INDEX = 1 # const for index of value in inference list couple
-	inferences = set([]) # intializes inferences to empty set
+	if inferences == None:
+		inferences = set([])
 	deQueue = deque() # use deque because it is the closest thing I can get to work
 
 	for cspBinaryConstraint in csp.binaryConstraints: # for every binary constraint
@@ -533,7 +1290,7 @@ def maintainArcConsistency(assignment, csp, var, value):
 			binConstraintVariable = cspBinaryConstraint.otherVariable(var) # saves binary constraint variable
 			deQueue.append((var, binConstraintVariable, cspBinaryConstraint))
 			# pushes the passed variable, the binary constraint variable, and the binary constraint itself on to queue
-	while (value != None and len(deQueue) > 0): # while value is valid and the queue is not empty
+	while (len(deQueue) > 0): # while the queue is not empty
 		poppedVar, nextBinConstraintVariable, poppedConstraint = deQueue.pop() # pops off queue and stores values into 3 variables
 		returnedRevise = revise(assignment, csp, poppedVar, nextBinConstraintVariable, poppedConstraint) # calls helper function revise, determines inconsistent values in passed variables returns altered inferences
 		if(returnedRevise == None): # if returned inferences are None
@@ -550,6 +1307,62 @@ def maintainArcConsistency(assignment, csp, var, value):
 	return inferences # return updated inferences
 
 
+"""
+	Singleton arc consistency (SAC) as a one-off filter before search. A value is kept only if assigning it
+	and maintaining arc consistency does not wipe out a domain. Incremental in the style of SAC-Opt: each
+	passing test remembers which domains its propagation read, and is repeated only when one of those loses a value.
+	Args:
+		assignment (Assignment): the partial assignment to filter, assumed arc consistent
+		csp (ConstraintSatisfactionProblem): the problem description
+		maxTests (int): stop after this many singleton tests, None for no limit
+		timeLimit (float): stop after this many seconds, None for no limit
+	Returns:
+		Assignment
+		the updated assignment or None if an inconsistent assignment
+"""
+def singletonArcConsistency(assignment, csp, maxTests=None, timeLimit=None):
+	domains = assignment.varDomains
+	neighbours = constraintNeighbours(csp)
+	deadline = time.perf_counter() + timeLimit if timeLimit != None else None
+	pending = deque((var, value) for var in domains for value in assignment.domain(var)) # singleton tests still to run
+	queued = set(pending)
+	readers = {} # variable -> tests whose propagation read its domain
+	tests = 0
+
+	def requeueReaders(changedVars):
+		for changedVar in changedVars:
+			for test in readers.pop(changedVar, ()):
+				if test not in queued and test[1] in assignment.domain(test[0]):
+					queued.add(test)
+					pending.append(test)
+
+	while len(pending) > 0:
+		if (maxTests != None and tests >= maxTests) or (deadline != None and time.perf_counter() > deadline):
+			break # budget spent, keep what has been removed so far
+		var, value = pending.popleft()
+		queued.discard((var, value))
+		if value not in assignment.domain(var) or len(assignment.domain(var)) == 1:
+			continue
+		tests += 1
+		inferences = maintainArcConsistency(assignment, csp, var, value)
+		if inferences == None: # var = value is not singleton arc consistent
+			domains[var].remove(value)
+			removals = propagateArcs(assignment, csp, var)
+			if removals == None:
+				domains[var].add(value)
+				return None
+			requeueReaders(set([var]).union(removedVar for (removedVar, removedValue) in removals))
+			continue
+		touched = set([var]).union(removedVar for (removedVar, removedValue) in inferences)
+		for (removedVar, removedValue) in inferences: # undo the test
+			domains[removedVar].add(removedValue)
+		for touchedVar in touched: # revise read both ends of every arc out of a touched variable
+			readers.setdefault(touchedVar, set()).add((var, value))
+			for neighbour, constraint in neighbours[touchedVar]:
+				readers.setdefault(neighbour, set()).add((var, value))
+	return assignment
+
+
 
 """
 	AC3 algorithm for constraint propogation. Used as a preprocessing step to reduce the problem
@@ -572,8 +1385,9 @@ def AC3(assignment, csp):
 	inferences = set([]) # intializes inferences to empty set
 	deQueue = deque() # use deque because it is the closest thing I can get to work
 
-
-
+	for cspBinaryConstraint in csp.binaryConstraints: # start with every arc, in both directions
+		deQueue.append((cspBinaryConstraint.var1, cspBinaryConstraint.var2, cspBinaryConstraint))
+		deQueue.append((cspBinaryConstraint.var2, cspBinaryConstraint.var1, cspBinaryConstraint))
 				# pushes the passed variable, the binary constraint variable, and the binary constraint itself on to queue
 	while (len(deQueue) > 0): # while value is valid and the queue is not empty
 		poppedVar, nextBinConstraintVariable, poppedConstraint = deQueue.pop() # pops off queue and stores values into 3 variables
@@ -591,6 +1405,75 @@ def AC3(assignment, csp):
 				inferences = inferences.union(returnedRevise) # does a union with the returned inferences and pre existing inferences, since they are both sets
 	return assignment # return assignment
 
+"""
+	Low-degree kernelisation for problems whose binary constraints are all NotEqualConstraints.
+	A variable with more values left than unpeeled neighbours always keeps a free value once those
+	neighbours are coloured, so it can be taken out and coloured last. Peeling repeats in the
+	order variables qualify (first in, first out, not lowest degree first) until only the core
+	remains where no variable qualifies.
+	Args:
+		assignment (Assignment): the assignment whose domains decide which variables qualify
+		csp (ConstraintSatisfactionProblem): the problem definition
+	Returns:
+		list<string>
+		the peeled variables in the order they were taken out
+"""
+def peelLowDegree(assignment, csp):
+	domains = assignment.varDomains
+	adjacency = { var: set() for var in domains } # distinct neighbours, parallel constraints counted once
+	for constraint in csp.binaryConstraints:
+		adjacency[constraint.var1].add(constraint.var2)
+		adjacency[constraint.var2].add(constraint.var1)
+	degree = { var: len(adjacency[var]) for var in domains }
+	peelable = lambda var: var not in adjacency[var] and len(assignment.domain(var)) > degree[var] # a self loop is never safe
+	queue = deque(var for var in domains if peelable(var))
+	queued = set(queue)
+	peeled = []
+	while len(queue) > 0:
+		var = queue.popleft()
+		peeled.append(var)
+		for other in adjacency[var]:
+			if other not in queued:
+				degree[other] -= 1
+				if peelable(other):
+					queued.add(other)
+					queue.append(other)
+	return peeled
+
+
+"""
+	Colours peeled variables around a solution of the core, in reverse peeling order, giving each the
+	first value of its domain that none of its neighbours holds.
+	Args:
+		solution (dictionary<string, value>): a solution of the core, extended in place
+		csp (ConstraintSatisfactionProblem): the full problem definition
+		domains (dictionary<string, set<value>>): the domains the variables were peeled with
+		peeled (list<string>): the variables returned by peelLowDegree
+	Returns:
+		dictionary<string, value>
+		the solution with every peeled variable assigned
+"""
+def reinsertPeeled(solution, csp, domains, peeled):
+	neighbours = constraintNeighbours(csp)
+	for var in reversed(peeled):
+		used = set(solution.get(other) for other, constraint in neighbours[var])
+		solution[var] = next(value for value in domains[var] if value not in used)
+	return solution
+
+
+"""
+	Runs one preprocessing step, timing it and counting the values it removes when statistics are on.
+"""
+def preprocess(assignment, csp, step, *args):
+	if _statistics is None:
+		return step(assignment, csp, *args)
+	before = sum(len(domain) for domain in assignment.varDomains.values())
+	result = _statistics.timed(step)(assignment, csp, *args)
+	if result != None:
+		_statistics.preprocessingRemoved[step.__name__] = before - sum(len(domain) for domain in result.varDomains.values())
+	return result
+
+
 """
 	Solves a binary constraint satisfaction problem.
 	Args:
@@ -599,19 +1482,67 @@ def AC3(assignment, csp):
 		selectVariableMethod (function): a function to decide which variable to assign next
 		inferenceMethod (function): a function to specify what type of inferences to use
 		useAC3 (boolean): specifies whether to use the AC3 preprocessing step or not
+		statistics (SearchStatistics or boolean): collect search statistics into this object, or a new one if True
+		breakSymmetry (boolean): only try one unused value per variable when all values are interchangeable
+		useSAC (boolean): specifies whether to run singleton arc consistency after AC3 or not
+		sacTimeLimit (float): seconds after which the SAC pass stops, None for no limit
+		sacMaxTests (int): singleton tests after which the SAC pass stops, None for no limit
+		useKernel (boolean): for NotEqual-only problems, search only the core left by peelLowDegree; the
+			number of variables peeled is reported as kernelRemoved in the statistics
 	Returns:
 		dictionary<string, value>
 		A map from variables to their assigned values. None if no solution exists.
+		With statistics enabled, a tuple of that map and the SearchStatistics.
 """
-def solve(csp, orderValuesMethod=leastConstrainingValuesHeuristic, selectVariableMethod=minimumRemainingValuesHeuristic, inferenceMethod=None, useAC3=True):
+def solve(csp, orderValuesMethod=leastConstrainingValuesHeuristic, selectVariableMethod=minimumRemainingValuesHeuristic, inferenceMethod=None, useAC3=True, statistics=None, breakSymmetry=False, useSAC=False, sacTimeLimit=None, sacMaxTests=None, useKernel=False):
+	global _statistics
+	if breakSymmetry and hasInterchangeableValues(csp):
+		orderValuesMethod = breakValueSymmetry(orderValuesMethod)
+	if not statistics:
+		return solveWithoutStatistics(csp, orderValuesMethod, selectVariableMethod, inferenceMethod, useAC3, useSAC, sacTimeLimit, sacMaxTests, useKernel)
+
+	stats = statistics if isinstance(statistics, SearchStatistics) else SearchStatistics()
+	outerStatistics = _statistics # solve may be nested inside another instrumented solve
+	_statistics = stats
+	start = time.perf_counter()
+	try:
+		solution = solveWithoutStatistics(csp, stats.timed(orderValuesMethod), stats.timed(selectVariableMethod),
+			inferenceMethod if inferenceMethod in (None, noInferences) else stats.timed(inferenceMethod), useAC3, useSAC, sacTimeLimit, sacMaxTests, useKernel)
+	finally:
+		stats.totalTime += time.perf_counter() - start
+		_statistics = outerStatistics
+	return solution, stats
+
+
+def solveWithoutStatistics(csp, orderValuesMethod, selectVariableMethod, inferenceMethod, useAC3, useSAC=False, sacTimeLimit=None, sacMaxTests=None, useKernel=False):
 	assignment = Assignment(csp)
+	fullCSP, peeled = csp, []
 
-	assignment = eliminateUnaryConstraints(assignment, csp)
+	assignment = preprocess(assignment, csp, eliminateUnaryConstraints)
 	if assignment == None:
 		return assignment
 
 	if useAC3:
-		assignment = AC3(assignment, csp)
+		propagate = AC3
+		if vectorised.available() and onlyNotEqualConstraints(csp) and \
+				not any(isinstance(domain, IntervalDomain) for domain in csp.varDomains.values()): # whole-graph waves instead of per-arc revise; the arrays would list every value
+			propagate = vectorised.notEqualAC3
+		assignment = preprocess(assignment, csp, propagate)
+		if assignment == None:
+			return assignment
+	if useKernel and onlyNotEqualConstraints(csp):
+		peeled = peelLowDegree(assignment, csp)
+		if _statistics is not None:
+			_statistics.kernelRemoved = len(peeled)
+		if peeled: # search the core only; the peeled variables are coloured afterwards
+			domains = assignment.varDomains
+			removed = set(peeled)
+			core = [var for var in csp.variables if var not in removed]
+			csp = ConstraintSatisfactionProblem(core, [domains[var] for var in core],
+				[c for c in csp.binaryConstraints if c.var1 not in removed and c.var2 not in removed])
+			assignment = Assignment(csp)
+	if useSAC:
+		assignment = preprocess(assignment, csp, singletonArcConsistency, sacMaxTests, sacTimeLimit)
 		if assignment == None:
 			return assignment
 	if inferenceMethod is None or inferenceMethod==noInferences:
@@ -621,4 +1552,71 @@ def solve(csp, orderValuesMethod=leastConstrainingValuesHeuristic, selectVariabl
 	if assignment == None:
 		return assignment
 
-	return assignment.extractSolution()
\ No newline at end of file
+	if peeled:
+		return reinsertPeeled(dict(assignment.extractSolution()), fullCSP, domains, peeled)
+	return assignment.extractSolution()
+
+
+"""
+	Recursive backtracking that visits every solution instead of stopping at the first.
+	Args:
+		assignment (Assignment): a partial assignment to expand upon
+		csp (ConstraintSatisfactionProblem): the problem definition
+		orderValuesMethod (function<assignment, csp, variable> returns list<value>): a function to decide the next value to try
+		selectVariableMethod (function<assignment, csp> returns variable): a function to decide which variable to assign next
+		inferenceMethod (function<assignment, csp, variable, value> returns set<variable, value>): a function to specify what type of inferences to use
+		solutionWeight (function<assignment> returns int): how many solutions each complete assignment stands for
+	Returns:
+		int
+		the summed weight of all complete assignments below this one
+"""
+def recursiveCount(assignment, csp, orderValuesMethod, selectVariableMethod, inferenceMethod, solutionWeight):
+	if assignment.isComplete():
+		return solutionWeight(assignment)
+	currentVariable = selectVariableMethod(assignment, csp)
+	if currentVariable == None:
+		return 0
+	total = 0
+	for currentValue in orderValuesMethod(assignment, csp, currentVariable):
+		if consistent(assignment, csp, currentVariable, currentValue):
+			inferenceList = inferenceMethod(assignment, csp, currentVariable, currentValue)
+			if inferenceList == None:
+				continue
+			assignment.assignedValues[currentVariable] = currentValue
+			total += recursiveCount(assignment, csp, orderValuesMethod, selectVariableMethod, inferenceMethod, solutionWeight)
+			for (currentInferenceVariable, currentInferenceValue) in inferenceList:
+				assignment.varDomains[currentInferenceVariable].add(currentInferenceValue)
+			assignment.assignedValues[currentVariable] = None
+	return total
+
+
+"""
+	Counts the solutions of a binary constraint satisfaction problem by exhaustive search. counting.count_solutions,
+	which caches the counts of independent components, is the canonical counter; this one is kept as the plain
+	search it is checked against. With breakSymmetry and interchangeable values, only one solution per renaming of the values is visited,
+	and a solution using j of the k values is scaled back up by the k!/(k-j)! renamings it stands for.
+	Args:
+		csp (ConstraintSatisfactionProblem): a CSP to be counted
+		breakSymmetry (boolean): search one representative per class of interchangeable-value solutions
+		selectVariableMethod (function): a function to decide which variable to assign next
+		inferenceMethod (function): a function to specify what type of inferences to use
+	Returns:
+		int
+		the number of solutions
+"""
+def countSolutions(csp, breakSymmetry=True, selectVariableMethod=minimumRemainingValuesHeuristic, inferenceMethod=forwardChecking):
+	assignment = eliminateUnaryConstraints(Assignment(csp), csp)
+	if assignment == None:
+		return 0
+	if not (breakSymmetry and hasInterchangeableValues(csp)):
+		return recursiveCount(assignment, csp, orderValues, selectVariableMethod, inferenceMethod, lambda complete: 1)
+
+	valueCount = len(next(iter(csp.varDomains.values()), ()))
+	def renamings(complete):
+		usedCount = len(set(complete.assignedValues.values()))
+		weight = 1
+		for i in range(usedCount): # k * (k - 1) * ... * (k - j + 1)
+			weight *= valueCount - i
+		return weight
+	return recursiveCount(assignment, csp, breakValueSymmetry(orderValues), selectVariableMethod, inferenceMethod, renamings)
+
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# batch.py
+# Solves many csp_parse-format files, or a stream of Sudoku records, through a
+# pool of warm worker processes and streams one JSON line per file or record,
+# in completion order.
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+import BinaryCSP
+from csp_io import get_lines, csp_parse, sudoku_csp
+from dimacs import read_dimacs
+from timeouts import SolveTimeout, raise_timeout, start_alarm, stop_alarm
+from utils import SudokuBitboard, read_sudokus, sudoku_side
+
+
+"""
+named solver options accepted in manifests, on the command line and by the server
+"""
+ORDER_VALUES = {
+    'first': BinaryCSP.orderValues,
+    'lcv': BinaryCSP.leastConstrainingValuesHeuristic,
+}
+SELECT_VARIABLE = {
+    'first': BinaryCSP.chooseFirstVariable,
+    'mrv': BinaryCSP.minimumRemainingValuesHeuristic,
+}
+INFERENCE = {
+    'none': BinaryCSP.noInferences,
+    'fc': BinaryCSP.forwardChecking,
+    'mac': BinaryCSP.maintainArcConsistency,
+}
+DEFAULT_OPTIONS = {'order': 'lcv', 'select': 'mrv', 'inference': 'fc', 'ac3': True, 'statistics': False,
+                   'colours': 4, 'engine': 'bitboard'}
+# how Sudoku records are solved: 'bitboard' (utils.SudokuBitboard, which ignores the
+# search options and statistics) or 'csp' (BinaryCSP.solve with the options)
+SUDOKU_ENGINES = ('bitboard', 'csp')
+# files with these suffixes are read as DIMACS graphs to colour with options['colours'] colours
+DIMACS_SUFFIXES = ('.col', '.col.gz')
+
+
+class SolveCancelled(Exception):
+    """
+    Raised inside a worker when the solve it is running is cancelled.
+    """
+    pass
+
+
+def _raise_cancelled(signum, frame):
+    raise SolveCancelled()
+
+
+"""
+init worker
+runs once per worker process so that every later task starts warm
+"""
+
+
+def init_worker():
+    # the parent handles Ctrl-C and tears the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGALRM, raise_timeout)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, _raise_cancelled)
+    # deep maps recurse once per variable
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+
+
+"""
+solve text
+parses and solves one CSP given as lines of csp_parse text
+returns a JSON-serialisable result record; never raises
+"""
+
+
+def solve_lines(lines, options=None, timeout=None):
+    return _solve_record(lambda: csp_parse(lines), options, timeout)
+
+
+def _solve_record(build, options, timeout):
+    opts = dict(DEFAULT_OPTIONS)
+    opts.update(options or {})
+
+    def search(record):
+        solution = BinaryCSP.solve(build(),
+                                   orderValuesMethod=ORDER_VALUES[opts['order']],
+                                   selectVariableMethod=SELECT_VARIABLE[opts['select']],
+                                   inferenceMethod=INFERENCE[opts['inference']],
+                                   useAC3=opts['ac3'],
+                                   statistics=opts['statistics'])
+        if opts['statistics']:
+            solution, statistics = solution
+            record['statistics'] = statistics.asDict()
+        return solution
+    return _search_record(search, timeout)
+
+
+def _search_record(search, timeout):
+    """
+    Runs search(record), which returns a solution or None and may add to the
+    record, under the timeout; errors, timeouts and cancellations become statuses.
+    """
+    start = time.perf_counter()
+    record = {}
+
+    start_alarm(timeout)
+    try:
+        solution = search(record)
+        if solution is None:
+            record['status'] = 'unsatisfiable'
+        else:
+            record['status'] = 'solved'
+            record['solution'] = dict(solution)
+    except SolveTimeout:
+        record['status'] = 'timeout'
+    except SolveCancelled:
+        record['status'] = 'cancelled'
+    except Exception as error:
+        record['status'] = 'error'
+        record['error'] = '{}: {}'.format(type(error).__name__, error)
+    finally:
+        if timeout:
+            stop_alarm()
+
+    record['seconds'] = round(time.perf_counter() - start, 6)
+    return record
+
+
+def _solve_bitboard(text):
+    board = SudokuBitboard.from_record(text)
+    return board.solution() if board.solve() else None
+
+
+"""
+solve task
+worker entry point for one manifest entry
+"""
+
+
+def solve_task(task):
+    record = {'id': task['id'], 'path': task['path']}
+    if task['path'].endswith(DIMACS_SUFFIXES):
+        options = dict(DEFAULT_OPTIONS, **(task.get('options') or {}))
+        record.update(_solve_record(lambda: read_dimacs(task['path'], options['colours']), options, task.get('timeout')))
+        return record
+    try:
+        lines = get_lines(task['path'])
+    except OSError as error:
+        record['status'] = 'error'
+        record['error'] = '{}: {}'.format(type(error).__name__, error)
+        return record
+    record.update(solve_lines(lines, task.get('options'), task.get('timeout')))
+    return record
+
+
+"""
+solve sudoku
+worker entry point for one (index, record, error) from utils.read_sudokus
+solved on a utils.SudokuBitboard unless options['engine'] is 'csp'
+the solution is returned as a record string in the same cell order
+"""
+
+
+def solve_sudoku(item, options=None, timeout=None):
+    index, text, error = item
+    if error is not None:
+        return {'id': index, 'status': 'error', 'error': error}
+    record = {'id': index}
+    if dict(DEFAULT_OPTIONS, **(options or {}))['engine'] == 'bitboard':
+        record.update(_search_record(lambda extra: _solve_bitboard(text), timeout))
+    else:
+        record.update(_solve_record(lambda: sudoku_csp(text), options, timeout))
+    if 'solution' in record:
+        side = sudoku_side(len(text))
+        record['solution'] = ''.join(record['solution']['R%dC%d' % (row, column)]
+                                     for row in range(side) for column in range(side))
+    return record
+
+
+"""
+run sudoku stream
+solves the records of a puzzle dump through a warm process pool, yielding result
+records as they complete; at most backlog records are read ahead of the results,
+so memory stays flat however large the input is
+"""
+
+
+def run_sudoku_stream(stream, size=49, processes=None, timeout=None, options=None, backlog=None):
+    processes = processes or os.cpu_count() or 1
+    backlog = backlog or 4 * processes
+    slots = threading.Semaphore(backlog)
+
+    def bounded():
+        for item in read_sudokus(stream, size):
+            slots.acquire()
+            yield item
+
+    task = functools.partial(solve_sudoku, options=options, timeout=timeout)
+    with multiprocessing.Pool(processes, initializer=init_worker) as pool:
+        try:
+            for record in pool.imap_unordered(task, bounded(), chunksize=1):
+                slots.release()
+                yield record
+        finally:
+            # unblock the pool's feeder thread if the caller stops early
+            for _ in range(backlog):
+                slots.release()
+
+
+"""
+read manifest
+yields tasks from a directory of CSP files or from a JSONL manifest
+each manifest line is {"path": ...} with optional "id", "timeout" and "options"
+"""
+
+
+def read_manifest(source, timeout=None, options=None):
+    if os.path.isdir(source):
+        entries = ({'path': os.path.join(source, name)} for name in sorted(os.listdir(source))
+                   if os.path.isfile(os.path.join(source, name)))
+    else:
+        entries = _read_jsonl(source)
+
+    for index, entry in enumerate(entries):
+        task = {'id': entry.get('id', index), 'path': entry['path'],
+                'timeout': entry.get('timeout', timeout),
+                'options': dict(options or {}, **entry.get('options', {}))}
+        if not os.path.isabs(task['path']) and not os.path.isdir(source):
+            task['path'] = os.path.join(os.path.dirname(os.path.abspath(source)), task['path'])
+        yield task
+
+
+def _read_jsonl(path):
+    with open(path, 'r') as manifest:
+        for line in manifest:
+            if line.strip():
+                yield json.loads(line)
+
+
+"""
+run batch
+fans tasks out across a warm process pool and yields result records as they complete
+"""
+
+
+def run_batch(tasks, processes=None):
+    with multiprocessing.Pool(processes, initializer=init_worker) as pool:
+        for record in pool.imap_unordered(solve_task, tasks, chunksize=1):
+            yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve many CSP files in parallel.')
+    parser.add_argument('source', help='directory of CSP files or a JSONL manifest, or with --sudoku '
+                                       'a puzzle dump (- for stdin)')
+    parser.add_argument('-j', '--processes', type=int, default=None)
+    parser.add_argument('-t', '--timeout', type=float, default=None, help='per-file timeout in seconds')
+    parser.add_argument('--order', choices=sorted(ORDER_VALUES), default=DEFAULT_OPTIONS['order'])
+    parser.add_argument('--select', choices=sorted(SELECT_VARIABLE), default=DEFAULT_OPTIONS['select'])
+    parser.add_argument('--inference', choices=sorted(INFERENCE), default=DEFAULT_OPTIONS['inference'])
+    parser.add_argument('--no-ac3', dest='ac3', action='store_false')
+    parser.add_argument('--statistics', action='store_true', help='include search statistics in each record')
+    parser.add_argument('-k', '--colours', type=int, default=DEFAULT_OPTIONS['colours'],
+                        help='colours for DIMACS .col graphs')
+    parser.add_argument('--sudoku', type=int, metavar='CELLS',
+                        help='read source as Sudoku records of this many cells (49, 81, ...)')
+    parser.add_argument('--engine', choices=SUDOKU_ENGINES, default=DEFAULT_OPTIONS['engine'],
+                        help='how --sudoku records are solved; bitboard ignores the search options')
+    args = parser.parse_args(argv)
+
+    options = {'order': args.order, 'select': args.select, 'inference': args.inference, 'ac3': args.ac3,
+               'statistics': args.statistics, 'colours': args.colours, 'engine': args.engine}
+    if args.sudoku:
+        stream = sys.stdin if args.source == '-' else open(args.source, 'r')
+        records = run_sudoku_stream(stream, args.sudoku, args.processes, args.timeout, options)
+    else:
+        stream = None
+        records = run_batch(read_manifest(args.source, args.timeout, options), args.processes)
+    try:
+        for record in records:
+            sys.stdout.write(json.dumps(record) + '\n')
+            sys.stdout.flush()
+    finally:
+        if stream is not None and stream is not sys.stdin:
+            stream.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python
+# benchmark.py
+# Synthetic instance generators and a harness that times every solver
+# configuration on them, for catching regressions and choosing defaults.
+import argparse
+import csv
+import gc
+import itertools
+import math
+import random
+import signal
+import sys
+import time
+import tracemalloc
+
+import BinaryCSP
+from timeouts import SolveTimeout, raise_timeout, start_alarm, stop_alarm
+
+
+class QueensConstraint(BinaryCSP.BinaryConstraint):
+    """
+    Queens on rows var1 and var2, offset rows apart, may not share a column or diagonal.
+    """
+
+    symmetric = True
+
+    def __init__(self, var1, var2, offset):
+        self.var1 = var1
+        self.var2 = var2
+        self.offset = offset
+
+    def isSatisfied(self, value1, value2):
+        return value1 != value2 and abs(value1 - value2) != self.offset
+
+    def __repr__(self):
+        return 'QueensConstraint (%s, %s)' % (str(self.var1), str(self.var2))
+
+
+# Generators
+# ====================================
+
+def _colours(k):
+    return set(range(1, k + 1))
+
+
+def colouring_csp(vertices, edges, k):
+    """
+    k-colouring of a graph as NotEqual constraints.
+    """
+    variables = list(vertices)
+    constraints = [BinaryCSP.NotEqualConstraint(a, b) for a, b in edges]
+    return BinaryCSP.ConstraintSatisfactionProblem(variables, [_colours(k) for _ in variables], constraints)
+
+
+def delaunay_edges(points):
+    """
+    Edges of the Delaunay triangulation of points, i.e. the adjacency of their
+    Voronoi regions. Uses scipy when it is installed and Bowyer-Watson otherwise.
+    """
+    try:
+        from scipy.spatial import Delaunay
+    except ImportError:
+        return _bowyer_watson(points)
+    edges = set()
+    for simplex in Delaunay(points).simplices:
+        for a, b in itertools.combinations(sorted(int(i) for i in simplex), 2):
+            edges.add((a, b))
+    return edges
+
+
+def _circumcircle(points, triangle):
+    (ax, ay), (bx, by), (cx, cy) = (points[i] for i in triangle)
+    d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+    if d == 0:
+        return (0.0, 0.0), float('inf')
+    ux = ((ax * ax + ay * ay) * (by - cy) + (bx * bx + by * by) * (cy - ay) + (cx * cx + cy * cy) * (ay - by)) / d
+    uy = ((ax * ax + ay * ay) * (cx - bx) + (bx * bx + by * by) * (ax - cx) + (cx * cx + cy * cy) * (bx - ax)) / d
+    return (ux, uy), (ax - ux) ** 2 + (ay - uy) ** 2
+
+
+def _bowyer_watson(points):
+    points = list(points)
+    n = len(points)
+    # super triangle well outside the unit square
+    points += [(-10.0, -10.0), (10.0, -10.0), (0.0, 10.0)]
+    triangles = {(n, n + 1, n + 2): _circumcircle(points, (n, n + 1, n + 2))}
+    for i in range(n):
+        x, y = points[i]
+        bad = [t for t, ((cx, cy), r2) in triangles.items() if (x - cx) ** 2 + (y - cy) ** 2 < r2]
+        boundary = {}
+        for t in bad:
+            for edge in ((t[0], t[1]), (t[1], t[2]), (t[2], t[0])):
+                key = tuple(sorted(edge))
+                boundary[key] = boundary.get(key, 0) + 1
+            del triangles[t]
+        for (a, b), count in boundary.items():
+            if count == 1:
+                t = (a, b, i)
+                triangles[t] = _circumcircle(points, t)
+    edges = set()
+    for t in triangles:
+        for a, b in itertools.combinations(sorted(t), 2):
+            if b < n:
+                edges.add((a, b))
+    return edges
+
+
+def planar_map(n, k, seed=0):
+    rng = random.Random(seed)
+    points = [(rng.random(), rng.random()) for _ in range(n)]
+    return colouring_csp(range(n), sorted(delaunay_edges(points)), k)
+
+
+# average degree at the k-colouring satisfiability threshold
+PHASE_TRANSITION_DEGREE = {3: 4.69, 4: 8.9, 5: 13.69, 6: 19.1}
+
+
+def planted_colourable(n, k, seed=0, degree=None):
+    """
+    Random graph with a hidden k-colouring, at the threshold degree by default.
+    """
+    rng = random.Random(seed)
+    degree = degree or PHASE_TRANSITION_DEGREE.get(k, 2 * k * math.log(k))
+    hidden = [rng.randrange(k) for _ in range(n)]
+    edges = set()
+    target = int(degree * n / 2)
+    while len(edges) < target:
+        a, b = rng.randrange(n), rng.randrange(n)
+        if hidden[a] != hidden[b]:
+            edges.add((min(a, b), max(a, b)))
+    return colouring_csp(range(n), sorted(edges), k)
+
+
+def queens(n, k=None, seed=0):
+    rows = list(range(n))
+    constraints = [QueensConstraint(a, b, b - a) for a, b in itertools.combinations(rows, 2)]
+    return BinaryCSP.ConstraintSatisfactionProblem(rows, [set(range(n)) for _ in rows], constraints)
+
+
+def sudoku(box, k=None, seed=0, holes=0.6):
+    """
+    (box*box)-sized Sudoku with clues from a shuffled valid grid as GoodValueConstraints.
+    """
+    rng = random.Random(seed)
+    size = box * box
+    cells = [(r, c) for r in range(size) for c in range(size)]
+    name = lambda cell: 'R%dC%d' % cell
+    constraints = []
+    for a, b in itertools.combinations(cells, 2):
+        if a[0] == b[0] or a[1] == b[1] or (a[0] // box, a[1] // box) == (b[0] // box, b[1] // box):
+            constraints.append(BinaryCSP.NotEqualConstraint(name(a), name(b)))
+    digits = list(range(1, size + 1))
+    rng.shuffle(digits)
+    clues = [BinaryCSP.GoodValueConstraint(name((r, c)), digits[(box * (r % box) + r // box + c) % size])
+             for r, c in cells if rng.random() > holes]
+    return BinaryCSP.ConstraintSatisfactionProblem([name(cell) for cell in cells], [set(range(1, size + 1)) for _ in cells],
+                                                   constraints, clues)
+
+
+FAMILIES = {
+    'planar': planar_map,
+    'planted': planted_colourable,
+    'queens': queens,
+    'sudoku': sudoku,
+}
+
+
+# Configurations
+# ====================================
+
+INFERENCES = [('bt', BinaryCSP.noInferences), ('fc', BinaryCSP.forwardChecking),
+              ('mac', BinaryCSP.maintainArcConsistency)]
+HEURISTICS = [('plain', BinaryCSP.orderValues, BinaryCSP.chooseFirstVariable),
+              ('mrv+lcv', BinaryCSP.leastConstrainingValuesHeuristic, BinaryCSP.minimumRemainingValuesHeuristic)]
+
+
+def configurations():
+    for (inferenceName, inference), useAC3, (heuristicName, order, select) in \
+            itertools.product(INFERENCES, (False, True), HEURISTICS):
+        name = '%s%s/%s' % (inferenceName, '+ac3' if useAC3 else '', heuristicName)
+        yield name, {'orderValuesMethod': order, 'selectVariableMethod': select,
+                     'inferenceMethod': inference, 'useAC3': useAC3}
+
+
+def run_one(csp, solveArgs, timeout=None):
+    """
+    Solves csp twice: once bare for wall time, once instrumented for node
+    count and peak traced memory. Returns a result row.
+    """
+    row = {'status': 'timeout', 'seconds': None, 'nodes': None, 'backtracks': None, 'peakKiB': None}
+    previous = signal.signal(signal.SIGALRM, raise_timeout)
+    try:
+        start_alarm(timeout)
+        start = time.perf_counter()
+        solution = BinaryCSP.solve(csp, **solveArgs)
+        row['seconds'] = time.perf_counter() - start
+        row['status'] = 'unsat' if solution is None else ('ok' if not BinaryCSP.violatedConstraints(csp, solution) else 'WRONG')
+
+        start_alarm(timeout)
+        tracemalloc.start()
+        _, stats = BinaryCSP.solve(csp, statistics=True, **solveArgs)
+        row['peakKiB'] = tracemalloc.get_traced_memory()[1] // 1024
+        row['nodes'] = stats.nodes
+        row['backtracks'] = stats.backtracks
+    except SolveTimeout:
+        # either solve running out of time makes the whole row a timeout
+        row['status'] = 'timeout'
+    finally:
+        stop_alarm()
+        signal.signal(signal.SIGALRM, previous)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+    return row
+
+
+def run_benchmarks(families, sizes, k, seeds, timeout, only=None):
+    for family in families:
+        for size in sizes:
+            for seed in range(seeds):
+                csp = FAMILIES[family](size, k, seed=seed)
+                for name, solveArgs in configurations():
+                    if only and not any(pattern in name for pattern in only):
+                        continue
+                    row = {'family': family, 'size': size, 'k': k, 'seed': seed, 'config': name}
+                    row.update(run_one(csp, solveArgs, timeout))
+                    yield row
+
+
+COLUMNS = ['family', 'size', 'k', 'seed', 'config', 'status', 'seconds', 'nodes', 'backtracks', 'peakKiB']
+
+
+# Forking
+# ====================================
+
+def _first_decision(assignment, csp):
+    """
+    One forward-checked decision, as a search branch starting from the state makes.
+    """
+    var = BinaryCSP.chooseFirstVariable(assignment, csp)
+    for value in BinaryCSP.orderValues(assignment, csp, var):
+        if BinaryCSP.forwardChecking(assignment, csp, var, value) is not None:
+            assignment.assignedValues[var] = value
+            return
+
+
+def _time_calls(function, times):
+    start = time.perf_counter()
+    for _ in range(times):
+        function()
+    return time.perf_counter() - start
+
+
+def _fork_after_change(assignment, var):
+    assignment.assignedValues[var] = None # a write, so the fork cannot just reuse the last one's base
+    return assignment.fork()
+
+
+def fork_cost(csp, forks=1000):
+    """
+    Cost of starting forks branches from one post-AC3 state, either by building
+    a new Assignment (copying every domain) or by Assignment.fork(). Each branch
+    makes one decision, so a fork copies only the domains it changes. Returns a
+    row per method with microseconds and traced KiB per branch, and
+    microseconds for making the assignment alone, which for fork() should not
+    grow with the number of variables.
+    """
+    base = BinaryCSP.AC3(BinaryCSP.eliminateUnaryConstraints(BinaryCSP.Assignment(csp), csp), csp)
+    if base is None:
+        return []
+    state = BinaryCSP.ConstraintSatisfactionProblem(csp.variables, base.varDomains, csp.binaryConstraints)
+    methods = [('copy', lambda: BinaryCSP.Assignment(state)), ('fork', base.fork)]
+    rows = []
+    for method, make in methods:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        branches = []
+        for _ in range(forks):
+            branch = make()
+            _first_decision(branch, csp)
+            branches.append(branch) # kept alive so their memory is counted
+        seconds = time.perf_counter() - start
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        copied = sum(len(branch.varDomains.own) if isinstance(branch.varDomains, BinaryCSP.DomainLayer)
+                     else len(branch.varDomains) for branch in branches)
+        del branches
+
+        var = csp.variables[0]
+        makeOnly = make if method == 'copy' else lambda: _fork_after_change(base, var)
+        gc.collect() # so freeing the branches above is not timed
+        makeSeconds = min(_time_calls(makeOnly, forks) for _ in range(3))
+        rows.append({'method': method, 'forks': forks, 'usPerFork': 1e6 * seconds / forks, 'usMakeOnly': 1e6 * makeSeconds / forks,
+                     'KiBPerFork': used / 1024.0 / forks, 'domainsCopied': copied / float(forks)})
+    return rows
+
+
+FORK_COLUMNS = ['family', 'size', 'k', 'seed', 'method', 'forks', 'usPerFork', 'usMakeOnly', 'KiBPerFork', 'domainsCopied']
+
+
+def run_fork_benchmarks(families, sizes, k, seeds, forks):
+    for family in families:
+        for size in sizes:
+            for seed in range(seeds):
+                csp = FAMILIES[family](size, k, seed=seed)
+                for result in fork_cost(csp, forks):
+                    row = {'family': family, 'size': size, 'k': k, 'seed': seed}
+                    row.update(result)
+                    yield row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark solver configurations on synthetic CSPs.')
+    parser.add_argument('--family', nargs='+', choices=sorted(FAMILIES), default=['planar'])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[20, 50, 100],
+                        help='vertices for maps, board size for queens, box size for sudoku')
+    parser.add_argument('-k', '--colours', type=int, default=4)
+    parser.add_argument('--seeds', type=int, default=3)
+    parser.add_argument('-t', '--timeout', type=float, default=10.0)
+    parser.add_argument('--config', nargs='*', help='only run configurations whose name contains one of these')
+    parser.add_argument('--csv', help='also write rows to this CSV file')
+    parser.add_argument('--forks', type=int,
+                        help='instead of solving, time this many copied versus forked assignments per instance')
+    args = parser.parse_args(argv)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+
+    if args.forks:
+        columns = FORK_COLUMNS
+        rows = run_fork_benchmarks(args.family, args.sizes, args.colours, args.seeds, args.forks)
+    else:
+        columns = COLUMNS
+        rows = run_benchmarks(args.family, args.sizes, args.colours, args.seeds, args.timeout, args.config)
+
+    out = None
+    if args.csv:
+        out = open(args.csv, 'w', newline='')
+        writer = csv.DictWriter(out, columns)
+        writer.writeheader()
+    widths = dict((column, 18 if column == 'config' else 10) for column in columns)
+    print(' '.join(column.ljust(widths[column]) for column in columns))
+    try:
+        for row in rows:
+            print(' '.join((('%.4f' % row[c]) if isinstance(row[c], float) else str(row[c])).ljust(widths[c])
+                           for c in columns))
+            sys.stdout.flush()
+            if out:
+                writer.writerow(row)
+                out.flush()
+    finally:
+        if out:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
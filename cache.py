@@ -0,0 +1,197 @@
+# cache.py
+# Solution cache keyed by a canonical hash of the CSP, with an in-memory LRU
+# tier and an optional size-bounded SQLite tier.
+import collections
+import hashlib
+import json
+import sqlite3
+import time
+
+import BinaryCSP
+
+
+"""
+canonical form
+a description of the CSP that does not depend on the order variables,
+domain values or constraints were listed in
+"""
+
+
+def canonical_form(csp):
+    domains = sorted((repr(var), domain_key(domain)) for var, domain in csp.varDomains.items())
+    unary = sorted(constraint_key(constraint, (constraint.var,)) for constraint in csp.unaryConstraints)
+    binary = sorted(constraint_key(constraint, (constraint.var1, constraint.var2))
+                    for constraint in csp.binaryConstraints)
+    return [domains, binary, unary]
+
+
+def domain_key(domain):
+    # interval domains are described by their intervals, never by their values
+    if isinstance(domain, BinaryCSP.IntervalDomain):
+        return ['intervals', domain.intervals()]
+    return sorted(repr(value) for value in domain)
+
+
+def constraint_key(constraint, variables):
+    variables = [repr(var) for var in variables]
+    if getattr(constraint, 'symmetric', False):
+        variables.sort()
+    # anything else the constraint stores (badValue, goodValue, tables ...) is part of its identity
+    params = sorted((name, repr(value)) for name, value in vars(constraint).items()
+                    if name not in ('var', 'var1', 'var2') and not name.startswith('_'))
+    return [type(constraint).__name__, variables, params]
+
+
+def canonical_hash(csp):
+    return hashlib.sha256(canonical_text(csp)).hexdigest()
+
+
+"""
+canonical check
+a second digest of the canonical form, independent of canonical_hash; stored
+with unsatisfiable entries, which have no solution to verify on a hit
+"""
+
+
+def canonical_check(csp):
+    return hashlib.blake2b(canonical_text(csp), digest_size=16).hexdigest()
+
+
+def canonical_text(csp):
+    return json.dumps(canonical_form(csp), separators=(',', ':')).encode('utf-8')
+
+
+class SolutionCache(object):
+    """
+    Two-tier cache of solutions. The memory tier holds maxEntries solutions in
+    LRU order; if path is given, solutions are also kept in a SQLite file that
+    is trimmed back to maxBytes, least recently used first.
+    """
+
+    UNSATISFIABLE = 'unsatisfiable'
+
+    def __init__(self, maxEntries=1024, path=None, maxBytes=64 * 1024 * 1024):
+        self.maxEntries = maxEntries
+        self.memory = collections.OrderedDict()
+        self.maxBytes = maxBytes
+        self.db = None
+        self.hits = collections.Counter()
+        if path:
+            self.db = sqlite3.connect(path)
+            self.db.execute('CREATE TABLE IF NOT EXISTS solutions '
+                            '(key TEXT PRIMARY KEY, body TEXT, size INTEGER, used REAL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS solutions_used ON solutions (used)')
+            self.db.commit()
+
+    def get(self, csp, key=None):
+        """
+        Returns (found, solution) where solution is None for a cached unsatisfiable
+        problem. Cached solutions that fail verification, and unsatisfiable entries
+        whose canonical_check does not match csp, are dropped.
+        """
+        key = key or canonical_hash(csp)
+        entry = self._memoryGet(key)
+        tier = 'memory'
+        if entry is None and self.db is not None:
+            entry = self._diskGet(key)
+            tier = 'disk'
+        if entry is None:
+            self.hits['miss'] += 1
+            return False, None
+
+        if isinstance(entry, dict) or entry == self.UNSATISFIABLE:
+            # entries written before the check was stored cannot be verified either
+            if not isinstance(entry, dict) or entry.get(self.UNSATISFIABLE) != canonical_check(csp):
+                self.hits['invalid'] += 1
+                self.discard(key)
+                return False, None
+            self.hits[tier] += 1
+            self._memoryPut(key, entry)
+            return True, None
+        solution = dict(entry)
+        if BinaryCSP.violatedConstraints(csp, solution):
+            self.hits['invalid'] += 1
+            self.discard(key)
+            return False, None
+        self.hits[tier] += 1
+        self._memoryPut(key, entry)
+        return True, solution
+
+    def put(self, csp, solution, key=None):
+        key = key or canonical_hash(csp)
+        if solution is None:
+            entry = {self.UNSATISFIABLE: canonical_check(csp)}
+        else:
+            entry = sorted(solution.items(), key=repr)
+        self._memoryPut(key, entry)
+        if self.db is not None:
+            body = json.dumps(entry)
+            self.db.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)',
+                            (key, body, len(body), time.time()))
+            self._diskEvict()
+            self.db.commit()
+
+    def discard(self, key):
+        self.memory.pop(key, None)
+        if self.db is not None:
+            self.db.execute('DELETE FROM solutions WHERE key = ?', (key,))
+            self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def _memoryGet(self, key):
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+        return entry
+
+    def _memoryPut(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxEntries:
+            self.memory.popitem(last=False)
+
+    def _diskGet(self, key):
+        row = self.db.execute('SELECT body FROM solutions WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        self.db.execute('UPDATE solutions SET used = ? WHERE key = ?', (time.time(), key))
+        self.db.commit()
+        entry = json.loads(row[0])
+        if isinstance(entry, dict) or entry == self.UNSATISFIABLE:
+            return entry
+        return [tuple(pair) for pair in entry]
+
+    def _diskEvict(self):
+        total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM solutions').fetchone()[0]
+        if total <= self.maxBytes:
+            return
+        for key, size in self.db.execute('SELECT key, size FROM solutions ORDER BY used').fetchall():
+            self.db.execute('DELETE FROM solutions WHERE key = ?', (key,))
+            total -= size
+            if total <= self.maxBytes:
+                break
+
+
+"""
+cached solve
+BinaryCSP.solve with the cache in front of it; takes the same keyword arguments
+and returns the same shape: with statistics, (solution, stats), where a cache
+hit reports statistics with no search in them
+"""
+
+
+def cached_solve(csp, cache, **solveArgs):
+    statistics = solveArgs.get('statistics')
+    key = canonical_hash(csp)
+    found, solution = cache.get(csp, key)
+    if found:
+        if statistics:
+            return solution, statistics if isinstance(statistics, BinaryCSP.SearchStatistics) else BinaryCSP.SearchStatistics()
+        return solution
+    result = BinaryCSP.solve(csp, **solveArgs)
+    cache.put(csp, result[0] if statistics else result, key)
+    return result
@@ -0,0 +1,227 @@
+# checkpoint.py
+# Iterative version of recursiveBacktrackingWithInferences whose whole state
+# lives in an explicit stack, so a long search can be saved to disk and resumed.
+import os
+import pickle
+import time
+import zlib
+
+import BinaryCSP
+from cache import canonical_hash
+
+
+CHECKPOINT_VERSION = 1
+
+
+class SearchFrame(object):
+    """
+    One decision on the search path: the variable, the values still to try,
+    and the value currently assigned with the inferences it made.
+    """
+
+    __slots__ = ('var', 'values', 'value', 'inferences')
+
+    def __init__(self, var, values, value=None, inferences=None):
+        self.var = var
+        self.values = values
+        self.value = value
+        self.inferences = inferences
+
+
+class IterativeSearch(object):
+    """
+    Backtracking search with inferences driven by an explicit stack of SearchFrames.
+    Visits nodes in the same order as BinaryCSP.recursiveBacktrackingWithInferences.
+    """
+
+    def __init__(self, csp, orderValuesMethod=BinaryCSP.leastConstrainingValuesHeuristic,
+                 selectVariableMethod=BinaryCSP.minimumRemainingValuesHeuristic,
+                 inferenceMethod=BinaryCSP.forwardChecking, useAC3=True):
+        self.csp = csp
+        self.orderValuesMethod = orderValuesMethod
+        self.selectVariableMethod = selectVariableMethod
+        self.inferenceMethod = inferenceMethod or BinaryCSP.noInferences
+        self.stack = []
+        self.descend = True # False while unwinding to the parent frame after a failure
+        self.finished = False
+        self.statistics = BinaryCSP.SearchStatistics()
+
+        assignment = BinaryCSP.eliminateUnaryConstraints(BinaryCSP.Assignment(csp), csp)
+        if assignment != None and useAC3:
+            assignment = BinaryCSP.AC3(assignment, csp)
+        self.assignment = assignment
+        if assignment == None:
+            self.finished = True
+
+    def _undo(self, frame):
+        for (var, value) in frame.inferences:
+            self.assignment.varDomains[var].add(value)
+        self.assignment.assignedValues[frame.var] = None
+        frame.value = None
+        frame.inferences = None
+
+    def step(self):
+        """
+        Expands or retracts one decision. Returns True once the search is over.
+        """
+        if self.finished:
+            return True
+        assignment, csp = self.assignment, self.csp
+        if self.descend:
+            if assignment.isComplete():
+                self.finished = True
+                return True
+            var = self.selectVariableMethod(assignment, csp)
+            if var == None:
+                self.descend = False
+                return False
+            values = self.orderValuesMethod(assignment, csp, var)
+            if not isinstance(values, BinaryCSP.IntervalValues): # interval runs stay unexpanded, popped from the front
+                values = list(values)
+            self.stack.append(SearchFrame(var, values))
+
+        frame = self.stack[-1]
+        if frame.inferences != None: # the subtree under the current value failed
+            self._undo(frame)
+            self.statistics.backtracks += 1
+        while frame.values:
+            value = frame.values.pop(0)
+            if not BinaryCSP.consistent(assignment, csp, frame.var, value):
+                continue
+            inferences = self.inferenceMethod(assignment, csp, frame.var, value)
+            if inferences == None:
+                continue
+            assignment.assignedValues[frame.var] = value
+            frame.value = value
+            frame.inferences = list(inferences)
+            self.statistics.nodes += 1
+            self.statistics.maxDepth = max(self.statistics.maxDepth, len(self.stack))
+            self.descend = True
+            return False
+
+        self.stack.pop()
+        self.descend = False
+        if not self.stack:
+            self.finished = True
+            return True
+        return False
+
+    def solution(self):
+        if self.assignment == None or not self.finished:
+            return None
+        return self.assignment.extractSolution()
+
+    def run(self, checkpointPath=None, checkpointInterval=60.0, timeLimit=None):
+        """
+        Steps until the search ends or timeLimit seconds pass, saving a checkpoint
+        every checkpointInterval seconds and when the time limit is reached.
+        Checkpoints are only taken between steps, so an interrupted run resumes
+        from its last periodic save. Returns True if the search finished.
+        """
+        start = lastSave = time.perf_counter()
+        steps = 0
+        while not self.step():
+            steps += 1
+            if steps & 255:
+                continue
+            now = time.perf_counter()
+            if checkpointPath and now - lastSave >= checkpointInterval:
+                self.statistics.totalTime += now - lastSave
+                lastSave = now
+                self.save(checkpointPath)
+            if timeLimit != None and now - start >= timeLimit:
+                break
+        self.statistics.totalTime += time.perf_counter() - lastSave
+        if checkpointPath and not self.finished:
+            self.save(checkpointPath)
+        return self.finished
+
+    # Checkpoints
+    # ====================================
+
+    def state(self):
+        """
+        Compact picklable state: domains are stored as the values pruned from the
+        CSP's domains, and the decision path as (var, values left, value, inferences).
+        Pruned values of an IntervalDomain are kept as an IntervalDomain.
+        """
+        pruned = {}
+        for var, domain in self.assignment.varDomains.items():
+            original = self.csp.varDomains[var]
+            if isinstance(original, BinaryCSP.IntervalDomain) and isinstance(domain, BinaryCSP.IntervalDomain):
+                removed = original.difference(domain)
+            else:
+                removed = [value for value in original if value not in domain]
+            if removed:
+                pruned[var] = removed
+        statistics = self.statistics.asDict()
+        return {
+            'version': CHECKPOINT_VERSION,
+            'csp': canonical_hash(self.csp),
+            'methods': self.methodNames(),
+            'pruned': pruned,
+            'stack': [(frame.var, frame.values, frame.value, frame.inferences) for frame in self.stack],
+            'descend': self.descend,
+            'finished': self.finished,
+            'statistics': dict((name, statistics[name]) for name in ('nodes', 'backtracks', 'maxDepth', 'totalTime')),
+        }
+
+    def methodNames(self):
+        return [self.orderValuesMethod.__name__, self.selectVariableMethod.__name__, self.inferenceMethod.__name__]
+
+    def save(self, path):
+        data = zlib.compress(pickle.dumps(self.state(), pickle.HIGHEST_PROTOCOL))
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as out:
+            out.write(data)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temporary, path)
+
+    def restore(self, state):
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError('unsupported checkpoint version %r' % (state.get('version'),))
+        if state['csp'] != canonical_hash(self.csp):
+            raise ValueError('checkpoint was written for a different CSP')
+        if state['methods'] != self.methodNames():
+            raise ValueError('checkpoint was written with methods %r, not %r' % (state['methods'], self.methodNames()))
+        assignment = BinaryCSP.Assignment(self.csp)
+        for var, removed in state['pruned'].items():
+            assignment.varDomains[var].difference_update(removed)
+        self.stack = [SearchFrame(*frame) for frame in state['stack']]
+        for frame in self.stack:
+            if frame.inferences != None:
+                assignment.assignedValues[frame.var] = frame.value
+        self.assignment = assignment
+        self.descend = state['descend']
+        self.finished = state['finished']
+        for name, value in state['statistics'].items():
+            setattr(self.statistics, name, value)
+
+    @classmethod
+    def load(cls, csp, path, **searchArgs):
+        search = cls(csp, useAC3=False, **searchArgs)
+        with open(path, 'rb') as stream:
+            search.restore(pickle.loads(zlib.decompress(stream.read())))
+        return search
+
+
+"""
+solve resumable
+solve with checkpoints: resumes from checkpointPath if it exists, saves to it
+periodically, and removes it once the search has finished
+returns the solution, or None if there is none or timeLimit ran out first
+"""
+
+
+def solve_resumable(csp, checkpointPath, checkpointInterval=60.0, timeLimit=None, **searchArgs):
+    if os.path.exists(checkpointPath):
+        searchArgs.pop('useAC3', None)
+        search = IterativeSearch.load(csp, checkpointPath, **searchArgs)
+    else:
+        search = IterativeSearch(csp, **searchArgs)
+    if not search.run(checkpointPath, checkpointInterval, timeLimit):
+        return None
+    if os.path.exists(checkpointPath):
+        os.remove(checkpointPath)
+    return search.solution()
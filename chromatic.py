@@ -0,0 +1,109 @@
+# chromatic.py
+# Finds the minimum number of colours for a map: a DSATUR colouring gives the
+# upper bound, a greedy clique the lower bound, and the bound is tightened one
+# colour at a time by repairing the previous colouring rather than re-solving.
+import BinaryCSP
+from incremental import repair_solution
+
+
+def _adjacency(csp):
+    adjacency = dict((var, set()) for var in csp.variables)
+    for constraint in csp.binaryConstraints:
+        if not isinstance(constraint, BinaryCSP.NotEqualConstraint):
+            raise ValueError('chromatic number needs NotEqual constraints only, got %r' % (constraint,))
+        if constraint.var1 != constraint.var2:
+            adjacency[constraint.var1].add(constraint.var2)
+            adjacency[constraint.var2].add(constraint.var1)
+    return adjacency
+
+
+"""
+dsatur
+greedy colouring that always colours the vertex with the most distinct neighbour colours next
+returns {vertex: colour} with colours 1, 2, ...
+"""
+
+
+def dsatur(adjacency):
+    colour = {}
+    saturation = dict((var, set()) for var in adjacency)
+    uncoloured = set(adjacency)
+    while uncoloured:
+        var = max(uncoloured, key=lambda v: (len(saturation[v]), len(adjacency[v])))
+        c = 1
+        while c in saturation[var]:
+            c += 1
+        colour[var] = c
+        uncoloured.discard(var)
+        for other in adjacency[var]:
+            saturation[other].add(c)
+    return colour
+
+
+"""
+greedy clique
+grows a clique from every vertex, highest degree first, and keeps the largest
+"""
+
+
+def greedy_clique(adjacency, tries=None):
+    order = sorted(adjacency, key=lambda v: -len(adjacency[v]))
+    best = []
+    for start in order[:tries]:
+        if len(adjacency[start]) < len(best):
+            break
+        clique = [start]
+        candidates = set(adjacency[start])
+        while candidates:
+            var = max(candidates, key=lambda v: len(adjacency[v] & candidates))
+            clique.append(var)
+            candidates &= adjacency[var]
+        if len(clique) > len(best):
+            best = clique
+    return best
+
+
+def _colouring_csp(csp, k, clique):
+    # every k-colouring can be renamed so the clique takes colours 1..len(clique)
+    pins = [BinaryCSP.GoodValueConstraint(var, i + 1) for i, var in enumerate(clique)]
+    return BinaryCSP.ConstraintSatisfactionProblem(csp.variables, [set(range(1, k + 1)) for _ in csp.variables],
+                                                   csp.binaryConstraints, pins)
+
+
+"""
+chromatic number
+returns (k, colouring, report) for the NotEqual graph of csp; its domains are ignored
+report holds the lower and upper bounds and, per k tried, how many vertices were recoloured
+"""
+
+
+def chromatic_number(csp, maxRadius=2, **solveArgs):
+    solveArgs.setdefault('inferenceMethod', BinaryCSP.forwardChecking)
+    adjacency = _adjacency(csp)
+    if not adjacency:
+        return 0, {}, {'lower': 0, 'upper': 0, 'steps': []}
+
+    colouring = dsatur(adjacency)
+    clique = greedy_clique(adjacency, tries=64)
+    # rename colours so the clique holds 1..len(clique), matching the pins used below
+    rename = dict((colouring[var], i + 1) for i, var in enumerate(clique))
+    spare = iter(c for c in range(1, max(colouring.values()) + 1) if c not in rename.values())
+    for c in sorted(set(colouring.values())):
+        if c not in rename:
+            rename[c] = next(spare)
+    colouring = dict((var, rename[c]) for var, c in colouring.items())
+
+    upper = max(colouring.values())
+    lower = max(len(clique), 1)
+    report = {'lower': lower, 'upper': upper, 'steps': []}
+    k = upper
+    while k > lower:
+        # the vertices holding colour k fall out of the smaller domain and are repaired locally
+        candidate, step = repair_solution(_colouring_csp(csp, k - 1, clique), colouring, (), maxRadius, **solveArgs)
+        step['k'] = k - 1
+        report['steps'].append(step)
+        if candidate is None:
+            break
+        colouring = candidate
+        k -= 1
+    return k, colouring, report
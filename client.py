@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# client.py
+# Local client for server.py, also usable as a smoke test from the command line.
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+
+from csp_io import get_lines
+
+
+class SolverClient(object):
+    """
+    Asyncio client that multiplexes many solve requests over one connection.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.replies = {}
+        self.stats = None
+        self.ids = itertools.count()
+        self.listener = asyncio.ensure_future(self._listen())
+
+    @classmethod
+    async def connect(cls, unixPath=None, host='127.0.0.1', port=8765):
+        if unixPath:
+            reader, writer = await asyncio.open_unix_connection(unixPath)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message.get('op') == 'stats':
+                if self.stats is not None and not self.stats.done():
+                    self.stats.set_result(message)
+                continue
+            if message.get('op') == 'cancel':
+                continue
+            future = self.replies.pop(message.get('id'), None)
+            if future is not None and not future.done():
+                future.set_result(message)
+        for future in self.replies.values():
+            if not future.done():
+                future.set_exception(ConnectionError('server closed the connection'))
+
+    async def _send(self, message):
+        self.writer.write((json.dumps(message) + '\n').encode())
+        await self.writer.drain()
+
+    async def solve(self, text, options=None, deadline=None, requestId=None):
+        """
+        Solve one CSP given as csp_parse text and return the server's record.
+        """
+        requestId = requestId if requestId is not None else next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.replies[requestId] = future
+        await self._send({'op': 'solve', 'id': requestId, 'csp': text,
+                          'options': options or {}, 'deadline': deadline})
+        return await future
+
+    async def cancel(self, requestId):
+        await self._send({'op': 'cancel', 'id': requestId})
+
+    async def getStats(self):
+        self.stats = asyncio.get_running_loop().create_future()
+        await self._send({'op': 'stats'})
+        return await self.stats
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.listener.cancel()
+
+
+async def _run(args):
+    client = await SolverClient.connect(args.unix, args.host, args.port)
+    options = {'inference': args.inference} if args.inference else {}
+    requests = [asyncio.ensure_future(client.solve(''.join(get_lines(path)), options, args.deadline, path))
+                for path in args.files]
+    if args.cancel_after is not None:
+        await asyncio.sleep(args.cancel_after)
+        for path in args.files:
+            await client.cancel(path)
+    for record in await asyncio.gather(*requests):
+        sys.stdout.write(json.dumps(record) + '\n')
+    sys.stdout.write(json.dumps(await client.getStats()) + '\n')
+    await client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Send CSP files to a running server.py.')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--unix')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--deadline', type=float, default=None)
+    parser.add_argument('--inference', choices=['none', 'fc', 'mac'])
+    parser.add_argument('--cancel-after', type=float, default=None,
+                        help='cancel every request after this many seconds')
+    asyncio.run(_run(parser.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
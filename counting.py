@@ -0,0 +1,190 @@
+# counting.py
+# Exact solution counting with component caching: after each decision the
+# unassigned variables split into independent components whose counts
+# multiply, and counts of components already seen are reused from a bounded
+# cache keyed by the component's variables and their current domains.
+import collections
+
+import BinaryCSP
+
+
+class ComponentCounter(object):
+    """
+    Counts the solutions of a binary CSP. Decisions are propagated by forward
+    checking, so a residual component only needs its variables' domains and the
+    constraints among them; that makes (variable, domain) pairs a complete key.
+    maxEntries bounds the cache, least recently used entries going first.
+    """
+
+    def __init__(self, csp, maxEntries=100000):
+        self.csp = csp
+        self.maxEntries = maxEntries
+        self.cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.neighbours = dict((var, []) for var in csp.variables)
+        self.loops = dict((var, []) for var in csp.variables)
+        for constraint in csp.binaryConstraints:
+            if constraint.var1 == constraint.var2:
+                self.loops[constraint.var1].append(constraint)
+            else:
+                self.neighbours[constraint.var1].append((constraint.var2, constraint))
+                self.neighbours[constraint.var2].append((constraint.var1, constraint))
+        self.sweep = self.sweepOrder()
+
+    def sweepOrder(self):
+        """
+        Breadth-first order of the variables from a far-out starting point in
+        each connected part, which keeps the boundary between the variables
+        decided and those left small.
+        """
+        order = {}
+        for var in self.csp.variables:
+            if var in order:
+                continue
+            start = self.breadthFirst(self.breadthFirst(var)[-1])[0] # the far end of a far end
+            for other in self.breadthFirst(start):
+                order[other] = len(order)
+        return order
+
+    def breadthFirst(self, start):
+        seen = set([start])
+        layer = [start]
+        visited = []
+        while layer:
+            visited.extend(layer)
+            following = []
+            for var in layer:
+                for other, _ in self.neighbours[var]:
+                    if other not in seen:
+                        seen.add(other)
+                        following.append(other)
+            layer = following
+        return visited
+
+    def count(self):
+        assignment = BinaryCSP.eliminateUnaryConstraints(BinaryCSP.Assignment(self.csp), self.csp)
+        if assignment == None:
+            return 0
+        domains = {}
+        for var, domain in assignment.varDomains.items():
+            # a constraint from a variable to itself only ever filters that variable's own values
+            domains[var] = frozenset(value for value in domain
+                                     if all(constraint.isSatisfied(value, value) for constraint in self.loops[var]))
+        if BinaryCSP.hasInterchangeableValues(self.csp):
+            return self.countSymmetric(domains)
+        return self.countComponents(domains)
+
+    def countSymmetric(self, domains):
+        """
+        With interchangeable values, every solution of a component can be renamed
+        so that its first variable and a neighbour take two fixed values; there are
+        k(k-1) such renamings, so only that one branch is searched.
+        """
+        total = 1
+        for component in self.components(domains):
+            var = min(component, key=self.sweep.__getitem__)
+            values = list(domains[var])
+            if len(component) == 1 or len(values) < 2:
+                total *= self.countComponents(dict((v, domains[v]) for v in component))
+                continue
+            other = self.neighbours[var][0][0]
+            branch = dict((v, domains[v]) for v in component)
+            if self.propagate(branch, [(var, values[0]), (other, values[1])]):
+                total *= len(values) * (len(values) - 1) * self.countComponents(branch)
+            else:
+                total = 0
+            if total == 0:
+                return 0
+        return total
+
+    def components(self, domains):
+        seen = set()
+        for start in domains:
+            if start in seen:
+                continue
+            seen.add(start)
+            component = [start]
+            stack = [start]
+            while stack:
+                var = stack.pop()
+                for other, _ in self.neighbours[var]:
+                    if other in domains and other not in seen:
+                        seen.add(other)
+                        component.append(other)
+                        stack.append(other)
+            yield component
+
+    def countComponents(self, domains):
+        total = 1
+        for component in self.components(domains):
+            if len(component) == 1:
+                total *= len(domains[component[0]])
+            else:
+                total *= self.countComponent(dict((var, domains[var]) for var in component))
+            if total == 0:
+                return 0
+        return total
+
+    def propagate(self, domains, decided):
+        """
+        Forward checks each (variable, value) in decided against the variables
+        still in domains. A variable left with one value is decided in turn; it
+        stays in domains, and so keeps being checked, until its own turn comes.
+        Returns False if a domain is wiped out.
+        """
+        queued = set(var for var, _ in decided)
+        while decided:
+            var, value = decided.pop()
+            domains.pop(var, None)
+            for other, constraint in self.neighbours[var]:
+                if other not in domains:
+                    continue
+                removed = constraint.unsupportedValues(other, domains[other], (value,))
+                if removed:
+                    domains[other] = domains[other].difference(removed)
+                    if not domains[other]:
+                        return False
+                if len(domains[other]) == 1 and other not in queued:
+                    queued.add(other)
+                    decided.append((other, next(iter(domains[other]))))
+        return True
+
+    def countComponent(self, domains):
+        key = frozenset(domains.items())
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        self.misses += 1
+
+        # branch along the sweep, so only the frontier of the sweep has pruned domains
+        # and the same residual components, as keys, come up again and again
+        var = min(domains, key=self.sweep.__getitem__)
+        rest = dict(domains)
+        del rest[var]
+        total = 0
+        for value in domains[var]:
+            branch = dict(rest)
+            if self.propagate(branch, [(var, value)]):
+                total += self.countComponents(branch)
+
+        self.cache[key] = total
+        if len(self.cache) > self.maxEntries:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+        return total
+
+
+"""
+count solutions
+the exact number of solutions of csp, as a Python int of any size
+this is the canonical counter; BinaryCSP.countSolutions is the plain search
+counter it is cross-checked against
+"""
+
+
+def count_solutions(csp, maxEntries=100000):
+    return ComponentCounter(csp, maxEntries).count()
+
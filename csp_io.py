@@ -0,0 +1,100 @@
+import BinaryCSP
+import utils
+
+def get_lines(fileName):
+    lines = []
+    with open(fileName,'r') as readFile:
+        for line in readFile:
+            lines.append(line)
+    return lines
+
+
+""" Takes a list of lines and creates a CSP representation.
+    Format:
+    variable values ...
+    ...
+    0
+    binary_constraint_type inputs ...
+    ...
+    0
+    unary_constraint_type inputs ... 
+    ...
+    A table constraint lists its allowed pairs, e.g. TableConstraint A B 1,2 2,3 """
+def csp_parse(csp_lines):
+    i = 0
+    variables = []
+    domains = []
+    while csp_lines[i].strip() != '0':
+        line = csp_lines[i].split()
+        variables.append(line[0])
+        domains.append(set(line[1:]))
+        i += 1
+    i += 1
+
+    binary_constraints = []
+    while csp_lines[i].strip() != '0':
+        line = csp_lines[i].split()
+        binary_constraints.append(getattr(BinaryCSP, line[0])(*line[1:]))
+        i += 1
+    i += 1
+
+    unary_constraints = []
+    while i < len(csp_lines):
+        line = csp_lines[i].split()
+        unary_constraints.append(getattr(BinaryCSP, line[0])(*line[1:]))
+        i += 1
+
+    return BinaryCSP.ConstraintSatisfactionProblem(variables, domains, binary_constraints, unary_constraints)
+
+""" Takes a list of lines and creates an Assignment representation.
+    Format:
+    csp_filename
+    variable new_domain_values ...
+    ...
+    0
+    variable assigned_value
+    ... """
+def assignment_parse(assignment_lines):
+    csp = None
+    with open(assignment_lines[0].strip()) as csp_file:
+        csp = csp_parse(csp_file.readlines())
+    assignment = BinaryCSP.Assignment(csp)
+
+    i = 1
+    while assignment_lines[i].strip() != '0':
+        line = assignment_lines[i].split()
+        assignment.varDomains[line[0]] = set(line[1:])
+        i += 1
+    i += 1
+
+    while i < len(assignment_lines):
+        line = assignment_lines[i].split()
+        assignment.assignedValues[line[0]] = line[1]
+        assignment.varDomains[line[0]] = set([line[1]])
+        i += 1
+
+    return assignment
+
+""" Takes one Sudoku record from utils.read_sudokus and creates a CSP representation.
+    Cells are named R<row>C<column> and hold the record's symbols; clues become
+    GoodValueConstraints. Boards whose side is a square also get box constraints,
+    the others (7x7) only row and column constraints. """
+def sudoku_csp(record):
+    side = utils.sudoku_side(len(record))
+    symbols = set(utils.SUDOKU_SYMBOLS[:side])
+    box = int(round(side ** 0.5))
+    if box * box != side:
+        box = None
+
+    cells = [(row, column) for row in range(side) for column in range(side)]
+    variables = ['R%dC%d' % cell for cell in cells]
+    binary_constraints = []
+    for i, a in enumerate(cells):
+        for b in cells[i + 1:]:
+            if a[0] == b[0] or a[1] == b[1] or \
+                    (box and (a[0] // box, a[1] // box) == (b[0] // box, b[1] // box)):
+                binary_constraints.append(BinaryCSP.NotEqualConstraint('R%dC%d' % a, 'R%dC%d' % b))
+    unary_constraints = [BinaryCSP.GoodValueConstraint(var, symbol)
+                         for var, symbol in zip(variables, record) if symbol in symbols]
+
+    return BinaryCSP.ConstraintSatisfactionProblem(variables, [symbols for _ in variables], binary_constraints, unary_constraints)
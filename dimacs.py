@@ -0,0 +1,119 @@
+# dimacs.py
+# Streaming reader and writer for graph colouring instances in DIMACS .col
+# format ("p edge N M" followed by "e u v" lines), plain or gzip-compressed.
+import gzip
+import io
+import sys
+
+import BinaryCSP
+
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def _open_text(source, mode):
+    """
+    Opens a path for text reading or writing, through gzip when the file is
+    (or, for writing, is named as) gzip-compressed; '-' means stdin/stdout.
+    """
+    if source == '-':
+        return sys.stdin if mode == 'r' else sys.stdout
+    if mode == 'r':
+        with open(source, 'rb') as probe:
+            compressed = probe.read(2) == GZIP_MAGIC
+    else:
+        compressed = source.endswith('.gz')
+    if compressed:
+        return io.TextIOWrapper(gzip.open(source, mode + 'b'), encoding='ascii')
+    return open(source, mode)
+
+
+"""
+iter dimacs
+yields ('p', vertices, edges) for the problem line and then (u, v) per edge,
+reading one line at a time; comment lines are skipped
+"""
+
+
+def iter_dimacs(source):
+    stream = _open_text(source, 'r') if isinstance(source, str) else source
+    try:
+        for number, line in enumerate(stream, 1):
+            fields = line.split()
+            if not fields or fields[0] == 'c':
+                continue
+            try:
+                if fields[0] == 'p':
+                    yield 'p', int(fields[2]), int(fields[3])
+                elif fields[0] == 'e':
+                    yield int(fields[1]), int(fields[2])
+                elif fields[0] not in ('n', 'x', 'd', 'v'): # vertex weights and other extensions are ignored
+                    raise ValueError(fields[0])
+            except (IndexError, ValueError):
+                raise ValueError('line {}: not a DIMACS line: {!r}'.format(number, line.rstrip()))
+    finally:
+        if stream is not source and stream is not sys.stdin:
+            stream.close()
+
+
+"""
+read dimacs
+builds a ConstraintSatisfactionProblem with variables 1..N, each with colours
+1..colours, and one NotEqualConstraint per distinct edge; self loops and edges
+listed in both directions are kept once
+"""
+
+
+def read_dimacs(source, colours):
+    vertices = None
+    seen = set()
+    constraints = []
+    for item in iter_dimacs(source):
+        if item[0] == 'p':
+            vertices = item[1]
+            continue
+        u, v = item
+        if vertices is None:
+            raise ValueError('edge {} {} before the problem line'.format(u, v))
+        if not (1 <= u <= vertices and 1 <= v <= vertices):
+            raise ValueError('edge {} {} names a vertex outside 1..{}'.format(u, v, vertices))
+        edge = (u, v) if u <= v else (v, u)
+        if edge not in seen:
+            seen.add(edge)
+            constraints.append(BinaryCSP.NotEqualConstraint(u, v))
+    if vertices is None:
+        raise ValueError('no problem line')
+    variables = range(1, vertices + 1)
+    domain = range(1, colours + 1)
+    return BinaryCSP.ConstraintSatisfactionProblem(variables, [domain for _ in variables], constraints)
+
+
+"""
+write dimacs
+writes the NotEqual constraints of csp as a DIMACS graph, numbering the
+variables 1..N in csp.variables order; other constraints cannot be expressed
+returns the {variable: vertex number} map used
+"""
+
+
+def write_dimacs(csp, target, comment=None):
+    numbers = dict((var, i) for i, var in enumerate(csp.variables, 1))
+    edges = set()
+    for constraint in csp.binaryConstraints:
+        if not isinstance(constraint, BinaryCSP.NotEqualConstraint):
+            raise ValueError('DIMACS graphs hold NotEqual constraints only, got %r' % (constraint,))
+        u, v = numbers[constraint.var1], numbers[constraint.var2]
+        edges.add((u, v) if u <= v else (v, u))
+
+    stream = _open_text(target, 'w') if isinstance(target, str) else target
+    try:
+        if comment:
+            for line in comment.splitlines():
+                stream.write('c {}\n'.format(line))
+        stream.write('p edge {} {}\n'.format(len(numbers), len(edges)))
+        for u, v in sorted(edges):
+            stream.write('e {} {}\n'.format(u, v))
+    finally:
+        if stream is not target and stream is not sys.stdout:
+            stream.close()
+    return numbers
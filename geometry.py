@@ -0,0 +1,114 @@
+# geometry.py
+# Builds the map colouring CSP straight from region polygons: touching pairs
+# are found through an STRtree spatial index instead of testing every pair.
+# Needs shapely 2; callers check available().
+import json
+
+import BinaryCSP
+
+try:
+    import numpy as np
+    import shapely
+    from shapely import wkt
+    from shapely.geometry import shape
+except ImportError:
+    shapely = None
+
+
+def available():
+    return shapely is not None
+
+
+"""
+read wkt
+reads one region per line as "name<TAB>WKT", or a bare WKT that is named by
+its line number; blank lines and lines starting with # are skipped
+returns (names, geometries)
+"""
+
+
+def read_wkt(path):
+    names, geometries = [], []
+    with open(path, 'r') as stream:
+        for number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            name, _, text = line.rpartition('\t')
+            try:
+                geometries.append(wkt.loads(text))
+            except Exception as error:
+                raise ValueError('line {}: {}'.format(number, error))
+            names.append(name or str(number))
+    return names, geometries
+
+
+"""
+read geojson
+reads the features of a GeoJSON FeatureCollection, named by the nameField
+property when given, else by the feature id, else by position
+returns (names, geometries)
+"""
+
+
+def read_geojson(path, nameField=None):
+    with open(path, 'r') as stream:
+        document = json.load(stream)
+    features = document['features'] if document.get('type') == 'FeatureCollection' else [document]
+    names, geometries = [], []
+    for index, feature in enumerate(features):
+        properties = feature.get('properties') or {}
+        if nameField is not None and nameField in properties:
+            name = properties[nameField]
+        else:
+            name = feature.get('id', index)
+        names.append(str(name))
+        geometries.append(shape(feature['geometry']))
+    return names, geometries
+
+
+def read_regions(path, nameField=None):
+    if path.lower().endswith(('.json', '.geojson')):
+        return read_geojson(path, nameField)
+    return read_wkt(path)
+
+
+"""
+touching pairs
+index pairs (i, j), i < j, of geometries that share a border, found with one
+bulk STRtree query; with ignoreCorners, regions that meet only at isolated
+points are not neighbours
+"""
+
+
+def touching_pairs(geometries, ignoreCorners=False):
+    geometries = np.asarray(geometries, dtype=object)
+    tree = shapely.STRtree(geometries)
+    left, right = tree.query(geometries, predicate='intersects')
+    keep = left < right
+    left, right = left[keep], right[keep]
+    if ignoreCorners and len(left):
+        # DE-9IM: interiors disjoint ('F') and boundaries meeting in points only ('0')
+        corner = shapely.relate_pattern(geometries[left], geometries[right], 'F***0****')
+        left, right = left[~corner], right[~corner]
+    return zip(left.tolist(), right.tolist())
+
+
+"""
+regions csp
+colouring CSP for the regions: one variable per name with colours 1..colours
+and a NotEqualConstraint for each touching pair
+"""
+
+
+def regions_csp(names, geometries, colours=4, ignoreCorners=False):
+    if len(set(names)) != len(names):
+        raise ValueError('region names must be unique')
+    constraints = [BinaryCSP.NotEqualConstraint(names[i], names[j])
+                   for i, j in touching_pairs(geometries, ignoreCorners)]
+    return BinaryCSP.ConstraintSatisfactionProblem(names, [set(range(1, colours + 1)) for _ in names], constraints)
+
+
+def read_regions_csp(path, colours=4, ignoreCorners=False, nameField=None):
+    names, geometries = read_regions(path, nameField)
+    return regions_csp(names, geometries, colours, ignoreCorners)
@@ -0,0 +1,169 @@
+# incremental.py
+# Repairs an existing solution after a small edit to the CSP (dynamic CSP),
+# re-searching only the neighbourhood of the edit.
+import BinaryCSP
+from cache import constraint_key
+
+
+class CSPDelta(object):
+    """
+    A small edit to a ConstraintSatisfactionProblem.
+    Constraints are matched by type, variables and parameters, so removed
+    constraints do not need to be the same objects that were added.
+    """
+
+    def __init__(self, addedConstraints=(), removedConstraints=(), addedVariables=None,
+                 removedVariables=(), changedDomains=None, addedUnaryConstraints=(),
+                 removedUnaryConstraints=()):
+        self.addedConstraints = list(addedConstraints)
+        self.removedConstraints = list(removedConstraints)
+        self.addedVariables = dict(addedVariables or {})
+        self.removedVariables = set(removedVariables)
+        self.changedDomains = dict(changedDomains or {})
+        self.addedUnaryConstraints = list(addedUnaryConstraints)
+        self.removedUnaryConstraints = list(removedUnaryConstraints)
+
+
+def _binaryKey(constraint):
+    return repr(constraint_key(constraint, (constraint.var1, constraint.var2)))
+
+
+def _unaryKey(constraint):
+    return repr(constraint_key(constraint, (constraint.var,)))
+
+
+"""
+apply delta
+builds the edited CSP; the original is left untouched
+"""
+
+
+def apply_delta(csp, delta):
+    domains = dict(csp.varDomains)
+    domains.update(delta.addedVariables)
+    domains.update(delta.changedDomains)
+    for var in delta.removedVariables:
+        domains.pop(var, None)
+
+    removed = set(_binaryKey(c) for c in delta.removedConstraints)
+    binary = [c for c in csp.binaryConstraints + delta.addedConstraints
+              if _binaryKey(c) not in removed and c.var1 in domains and c.var2 in domains]
+    removedUnary = set(_unaryKey(c) for c in delta.removedUnaryConstraints)
+    unary = [c for c in csp.unaryConstraints + delta.addedUnaryConstraints
+             if _unaryKey(c) not in removedUnary and c.var in domains]
+
+    variables = [var for var in csp.variables if var in domains]
+    variables += [var for var in domains if var not in csp.varDomains]
+    return BinaryCSP.ConstraintSatisfactionProblem(variables, domains, binary, unary)
+
+
+"""
+prefer previous
+wraps a value ordering so that a variable's old value is tried first
+"""
+
+
+def prefer_previous(previous, orderValuesMethod):
+    def orderWithPrevious(assignment, csp, var):
+        values = orderValuesMethod(assignment, csp, var)
+        old = previous.get(var)
+        if old in values:
+            values.remove(old)
+            values.insert(0, old)
+        return values
+    return orderWithPrevious
+
+
+def _conflicts(csp, solution):
+    dirty = set()
+    for violation in BinaryCSP.violatedConstraints(csp, solution):
+        if isinstance(violation, tuple):
+            dirty.add(violation[1])
+        elif isinstance(violation, BinaryCSP.BinaryConstraint):
+            dirty.update((violation.var1, violation.var2))
+        else:
+            dirty.add(violation.var)
+    return dirty
+
+
+def _subproblem(csp, neighbours, free, solution):
+    """
+    CSP over the free variables only, with the values of fixed neighbours
+    folded into the free variables' domains.
+    """
+    domains = {}
+    for var in free:
+        domain = BinaryCSP.copyDomain(csp.varDomains[var])
+        for other, constraint in neighbours[var]:
+            if other in free:
+                continue
+            domain.difference_update(constraint.unsupportedValues(var, domain, (solution[other],)))
+        domains[var] = domain
+    variables = [var for var in csp.variables if var in free]
+    binary = [c for c in csp.binaryConstraints if c.var1 in free and c.var2 in free]
+    unary = [c for c in csp.unaryConstraints if c.var in free]
+    return BinaryCSP.ConstraintSatisfactionProblem(variables, domains, binary, unary)
+
+
+"""
+repair solution
+makes a possibly inconsistent solution valid again by re-solving growing
+neighbourhoods of the conflicting variables, then the whole problem
+returns (solution, report); solution is None if the CSP is unsatisfiable
+"""
+
+
+def repair_solution(csp, solution, dirty=(), maxRadius=2, **solveArgs):
+    previous = dict(solution)
+    current = dict((var, value) for var, value in solution.items() if var in csp.varDomains)
+    dirty = set(var for var in dirty if var in csp.varDomains)
+    dirty |= set(var for var in csp.varDomains if var not in current)
+    dirty |= _conflicts(csp, current)
+    report = {'dirty': len(dirty), 'radius': None, 'fullSolve': False, 'changed': 0, 'added': 0}
+    if not dirty:
+        return current, report
+
+    orderValuesMethod = solveArgs.pop('orderValuesMethod', BinaryCSP.leastConstrainingValuesHeuristic)
+    solveArgs['orderValuesMethod'] = prefer_previous(previous, orderValuesMethod)
+    neighbours = BinaryCSP.constraintNeighbours(csp)
+
+    free = set(dirty)
+    repaired = None
+    for radius in range(maxRadius + 1):
+        if radius > 0:
+            frontier = set(other for var in free for other, _ in neighbours[var]) - free
+            if not frontier:
+                break
+            free |= frontier
+        if len(free) == len(csp.varDomains):
+            break
+        partial = BinaryCSP.solve(_subproblem(csp, neighbours, free, current), **solveArgs)
+        if partial is not None:
+            repaired = dict(current)
+            repaired.update(partial)
+            report['radius'] = radius
+            break
+
+    if repaired is None:
+        report['fullSolve'] = True
+        repaired = BinaryCSP.solve(csp, **solveArgs)
+        if repaired is None:
+            return None, report
+
+    repaired = dict(repaired)
+    report['added'] = sum(1 for var in repaired if var not in previous)
+    report['changed'] = sum(1 for var in repaired if var in previous and repaired[var] != previous[var])
+    return repaired, report
+
+
+"""
+resolve
+applies a delta to a solved CSP and repairs the old solution locally
+returns (new csp, solution, report)
+"""
+
+
+def resolve(csp, previousSolution, delta, maxRadius=2, **solveArgs):
+    edited = apply_delta(csp, delta)
+    solution, report = repair_solution(edited, previousSolution, (), maxRadius, **solveArgs)
+    return edited, solution, report
@@ -11,15 +11,12 @@ import sudoku
 
 # Imports
 # ====================================
-import networkx
 import re
 
 import numpy as np
 import sys
-import scipy
 import copy
 
-from scipy.sparse import coo_matrix
 
 import argparse
 import sys
@@ -115,13 +112,15 @@ class ConstraintGraph(object):
     """
     The constraint graph class will store the
     individual variables and not equal constraints.
+    The adjacency is held as arrays in CSR form:
+    the neighbours of node i are
+    indices[indptr[i]:indptr[i + 1]].
     """
 
     def __init__(self, Constraints, Variables):
         """
         Define the basic contents.
         """
-        self.Graph = networkx.Graph()
         # Set storage for the variables and arcs.
         self.b = []
 
@@ -130,33 +129,66 @@ class ConstraintGraph(object):
 
         self.Constraints = set(Constraints)
 
-        # The relationship can be used as a graph.
-
-
-
-
-
         # Iterate over the variables and
         # add them in by name as a dict.
         self.dict = dict(self.Variables)
 
-        for Name in range(len(self.Variables)):
-            self.Graph.add_nodes_from(self.dict)
-
-
-
-        # Now add the constraint pairs as
-        # tuples and in the graph so that
-        # we can find them later.
+        # Number the nodes: the variables first, then
+        # any name that only turns up in a constraint.
+        self.nodeNames = list(self.dict)
+        self.nodeIndex = dict((Name, i) for i, Name in enumerate(self.nodeNames))
         for (VarA, VarB) in Constraints:
-            self.Graph.add_edge(VarA, VarB, nodetype=int)
-
-
-        print("Edges is # for data confirmation " + str(self.Graph.number_of_edges()))
-
+            for Name in (VarA, VarB):
+                if Name not in self.nodeIndex:
+                    self.nodeIndex[Name] = len(self.nodeNames)
+                    self.nodeNames.append(Name)
+
+        # Now add the constraint pairs in bulk:
+        # both directions of every edge, duplicates
+        # dropped, sorted by source into CSR.
+        Count = len(self.nodeNames)
+        Pairs = np.array([(self.nodeIndex[VarA], self.nodeIndex[VarB]) for (VarA, VarB) in Constraints],
+                         dtype=np.int64).reshape(-1, 2)
+        Src = np.concatenate((Pairs[:, 0], Pairs[:, 1]))
+        Dst = np.concatenate((Pairs[:, 1], Pairs[:, 0]))
+        Keys = np.unique(Src * Count + Dst)
+        self.src = Keys // Count
+        self.indices = Keys % Count
+        self.indptr = np.zeros(Count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.src, minlength=Count), out=self.indptr[1:])
+
+
+        print("Edges is # for data confirmation " + str(self.numberOfEdges()))
+
+
+    def numberOfEdges(self):
+        # each edge is stored in both directions, a self loop once
+        Loops = int(np.count_nonzero(self.src == self.indices))
+        return (len(self.indices) - Loops) // 2 + Loops
+
+    def neighbours(self, Name):
+        i = self.nodeIndex[Name]
+        return [self.nodeNames[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
+
+    def adjacencyMatrix(self, dtype=np.int8):
+        """
+        Dense V x V adjacency matrix in nodes() order.
+        """
+        Matrix = np.zeros((len(self.nodeNames), len(self.nodeNames)), dtype=dtype)
+        Matrix[self.src, self.indices] = 1
+        return Matrix
 
-        #networkx.draw(self.Graph, with_exampleels=True, font_size=16)
-        #plt.show()
+    def toNetworkx(self):
+        """
+        The graph as a networkx Graph, for drawing only;
+        networkx is not needed for anything else.
+        """
+        import networkx
+        Graph = networkx.Graph()
+        Graph.add_nodes_from(self.nodeNames)
+        Graph.add_edges_from((self.nodeNames[i], self.nodeNames[j])
+                             for i, j in zip(self.src.tolist(), self.indices.tolist()) if i <= j)
+        return Graph
 
 
     def returnvariables(self):
@@ -171,9 +203,7 @@ class ConstraintGraph(object):
 
             if (len(self.Variables.CurrDomain) != 1):
                 return (False)
-        self.A = networkx.adjacency_matrix(self.Graph)
-        import numpy
-        self.B = numpy.array(self.A)
+        self.B = self.adjacencyMatrix(dtype=np.int64)
         print(self.B)
         return self.B
     def isComplete(self):
@@ -183,8 +213,7 @@ class ConstraintGraph(object):
         in its current domain.
         """
 
-        self.A = networkx.adjacency_matrix(self.Graph)
-        self.B = coo_matrix(self.A, dtype=np.int8).toarray()
+        self.B = self.adjacencyMatrix()
         #print(self.B)
         #print(self.B.shape)
 
@@ -193,7 +222,7 @@ class ConstraintGraph(object):
 
 
 
-        return self.Graph.nodes()
+        return list(self.nodeNames)
 
 
 
@@ -212,6 +241,8 @@ class Graph():
             self.graph = [[0 for column in range(vertices)] \
                           for row in range(vertices)]
             self.output = []
+            self.peeled = set()
+            self.kernelRemoved = 0
         # A utility function to check
         # if the current color assignment
         # is safe for vertex v
@@ -221,12 +252,36 @@ class Graph():
                     return False
             return True
 
+        # Peel vertices with fewer than m neighbours
+        # left, in the order they qualify; they always
+        # have a free colour once the rest is coloured
+        def peelLowDegree(self, m):
+            degree = [sum(1 for i in range(self.V) if self.graph[v][i] == 1 and i != v)
+                      for v in range(self.V)]
+            queue = [v for v in range(self.V) if degree[v] < m and self.graph[v][v] != 1]
+            queued = set(queue)
+            peeled = []
+            while queue:
+                v = queue.pop(0)
+                peeled.append(v)
+                for i in range(self.V):
+                    if self.graph[v][i] == 1 and i not in queued:
+                        degree[i] -= 1
+                        if degree[i] < m and self.graph[i][i] != 1:
+                            queued.add(i)
+                            queue.append(i)
+            return peeled
+
         # A recursive utility function to solve m
         # coloring  problem
         def graphColourUtil(self, m, colour, v):
             if v == self.V:
                 return True
 
+            # peeled vertices are coloured after the core
+            if v in self.peeled:
+                return self.graphColourUtil(m, colour, v + 1)
+
             for c in range(1, m + 1):
                 if self.isSafe(v, colour, c) == True:
                     colour[v] = c
@@ -234,11 +289,19 @@ class Graph():
                         return True
                     colour[v] = 0
 
-        def graphColouring(self,m):
+        def graphColouring(self, m, useKernel=False):
             colour = [0] * self.V
+            self.peeled = set()
+            peeled = self.peelLowDegree(m) if useKernel else []
+            self.kernelRemoved = len(peeled)
+            self.peeled = set(peeled)
             if self.graphColourUtil(m, colour, 0) == None:
                 return False
 
+            # Put the peeled vertices back, last peeled first
+            for v in reversed(peeled):
+                colour[v] = next(c for c in range(1, m + 1) if self.isSafe(v, colour, c))
+
             # Print the solution
             print("Solution exist and Following are the assigned colours: ")
 
@@ -331,7 +394,6 @@ def readVarsBT(InputStream):
 
     # Allocate storage for the vars.
     Variable = {}
-    G = networkx.Graph()
     # Read in and print the first line.
     with open(InputStream, 'r') as InputStream:
         First = InputStream.readline()[:-1]
@@ -378,7 +440,6 @@ def readVarsAC3(InputStream):
 
     # Allocate storage for the vars.
     Variable = {}
-    G = networkx.Graph()
     # Read in and print the first line.
     with open(InputStream, 'r') as InputStream:
         First = InputStream.readline()[:-1]
@@ -433,7 +494,6 @@ def readVarsAC3state(InputStream):
 
     # Allocate storage for the vars.
     Variable = {}
-    G = networkx.Graph()
     # Read in and print the first line.
     with open(InputStream, 'r') as InputStream:
         First = InputStream.readline()[:-1]
@@ -482,7 +542,7 @@ def readVarsAC3values(InputStream):
 
             # Allocate storage for the vars.
             Variable = {}
-            G = networkx.Graph()
+            G = None
             # Read in and print the first line.
             with open(InputStream, 'r') as InputStream:
                 First = InputStream.readline()[:-1]
@@ -522,78 +582,7 @@ def readVarsAC3values(InputStream):
             return G
 import BinaryCSP
 
-def get_lines(fileName):
-    lines = []
-    with open(fileName,'r') as readFile:
-        for line in readFile:
-            lines.append(line)
-    return lines
-
-
-""" Takes a list of lines and creates a CSP representation.
-    Format:
-    variable values ...
-    ...
-    0
-    binary_constraint_type inputs ...
-    ...
-    0
-    unary_constraint_type inputs ... 
-    ... """
-def csp_parse(csp_lines):
-    i = 0
-    variables = []
-    domains = []
-    while csp_lines[i].strip() != '0':
-        line = csp_lines[i].split()
-        variables.append(line[0])
-        domains.append(set(line[1:]))
-        i += 1
-    i += 1
-
-    binary_constraints = []
-    while csp_lines[i].strip() != '0':
-        line = csp_lines[i].split()
-        binary_constraints.append(getattr(BinaryCSP, line[0])(*line[1:]))
-        i += 1
-    i += 1
-
-    unary_constraints = []
-    while i < len(csp_lines):
-        line = csp_lines[i].split()
-        unary_constraints.append(getattr(BinaryCSP, line[0])(*line[1:]))
-        i += 1
-
-    return BinaryCSP.ConstraintSatisfactionProblem(variables, domains, binary_constraints, unary_constraints)
-
-""" Takes a list of lines and creates an Assignment representation.
-    Format:
-    csp_filename
-    variable new_domain_values ...
-    ...
-    0
-    variable assigned_value
-    ... """
-def assignment_parse(assignment_lines):
-    csp = None
-    with open(assignment_lines[0].strip()) as csp_file:
-        csp = csp_parse(csp_file.readlines())
-    assignment = BinaryCSP.Assignment(csp)
-
-    i = 1
-    while assignment_lines[i].strip() != '0':
-        line = assignment_lines[i].split()
-        assignment.varDomains[line[0]] = set(line[1:])
-        i += 1
-    i += 1
-
-    while i < len(assignment_lines):
-        line = assignment_lines[i].split()
-        assignment.assignedValues[line[0]] = line[1]
-        assignment.varDomains[line[0]] = set([line[1]])
-        i += 1
-
-    return assignment
+from csp_io import get_lines, csp_parse, assignment_parse
 
 
 
@@ -624,7 +613,18 @@ if __name__ == '__main__':
     G = LittleG1
     g.graph = LittleG1
     m = 5
-    a = g.graphColouring(m)
+    if sys.argv[1] == 'CHROMATIC':
+        # Use the fewest colours the map allows instead of a fixed five.
+        import chromatic
+        Borders = BinaryCSP.ConstraintSatisfactionProblem(list(LittleG2), [set() for Node in LittleG2],
+            [BinaryCSP.NotEqualConstraint(VarA, VarB) for (VarA, VarB) in Constraints])
+        m, Colouring, Report = chromatic.chromatic_number(Borders)
+        print("Chromatic number: {} (clique bound {}, greedy bound {})".format(m, Report['lower'], Report['upper']))
+    # Peeling low-degree vertices first is opt-in: main.py MAC Map.txt --kernel
+    UseKernel = '--kernel' in sys.argv[3:]
+    a = g.graphColouring(m, useKernel=UseKernel)
+    if UseKernel:
+        print("Kernel removed {} of {} vertices".format(g.kernelRemoved, g.V))
     c = LittleG.nodes()
     d = zip(a,c)
 
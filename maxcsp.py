@@ -0,0 +1,174 @@
+# maxcsp.py
+# Max-CSP: treats the unary and binary constraints of a CSP as soft and looks
+# for the complete assignment whose violated constraints weigh the least, by
+# depth-first branch and bound that reports every improvement as it is found.
+import random
+import time
+
+import BinaryCSP
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class _BranchAndBound(object):
+    """
+    Search state: the partial assignment, its cost so far, and for every
+    unassigned variable and value the weight of the constraints that value
+    would break with the assigned variables (the inconsistency counts).
+    """
+
+    def __init__(self, csp, weights, deadline):
+        self.csp = csp
+        self.deadline = deadline
+        self.weight = lambda constraint: weights.get(constraint, 1)
+        self.neighbours = BinaryCSP.constraintNeighbours(csp)
+        self.assigned = {}
+        self.best = float('inf')
+        self.nodes = 0
+
+        # unary constraints only ever depend on the one value, so they start the counts
+        self.counts = dict((var, dict.fromkeys(domain, 0)) for var, domain in csp.varDomains.items())
+        for constraint in csp.unaryConstraints:
+            for value, count in self.counts[constraint.var].items():
+                if not constraint.isSatisfied(value):
+                    self.counts[constraint.var][value] = count + self.weight(constraint)
+        self.unaryCosts = dict((var, dict(counts)) for var, counts in self.counts.items())
+
+    def lowerBound(self):
+        # every unassigned variable will add at least its cheapest count
+        return sum(min(self.counts[var].values()) for var in self.counts if var not in self.assigned)
+
+    def selectVariable(self):
+        # the variable whose cheapest value is dearest, then the most constrained
+        unassigned = (var for var in self.counts if var not in self.assigned)
+        return max(unassigned, key=lambda var: (min(self.counts[var].values()), len(self.neighbours[var])))
+
+    def assign(self, var, value):
+        changes = []
+        for other, constraint in self.neighbours[var]:
+            if other in self.assigned or other == var:
+                continue
+            weight = self.weight(constraint)
+            counts = self.counts[other]
+            for otherValue in counts:
+                if not constraint.isSatisfiedFor(var, value, otherValue):
+                    counts[otherValue] += weight
+                    changes.append((other, otherValue, weight))
+        self.assigned[var] = value
+        return changes
+
+    def unassign(self, var, changes):
+        del self.assigned[var]
+        for other, otherValue, weight in changes:
+            self.counts[other][otherValue] -= weight
+
+    def violationCost(self, var, value, solution):
+        cost = self.unaryCosts[var][value]
+        for other, constraint in self.neighbours[var]:
+            if other != var and not constraint.isSatisfiedFor(var, value, solution[other]):
+                cost += self.weight(constraint)
+        return cost
+
+    def improve(self, solution, cost, steps, rng):
+        """
+        Min-conflicts local search from a complete assignment: moves a variable on a
+        violated constraint to its cheapest value. Yields each strictly cheaper assignment.
+        """
+        solution = dict(solution)
+        best = cost
+        local = dict((var, self.violationCost(var, value, solution)) for var, value in solution.items())
+        conflicted = set(var for var in local if local[var])
+        for step in range(steps):
+            if cost == 0 or (self.deadline is not None and time.perf_counter() > self.deadline):
+                return
+            var = rng.choice(list(conflicted))
+            costs = dict((value, self.violationCost(var, value, solution)) for value in self.counts[var])
+            cheapest = min(costs.values())
+            solution[var] = rng.choice([value for value in costs if costs[value] == cheapest])
+            cost += cheapest - local[var]
+            # only var and its neighbours can change how much they violate
+            for other in [var] + [other for other, constraint in self.neighbours[var]]:
+                local[other] = self.violationCost(other, solution[other], solution)
+                if local[other]:
+                    conflicted.add(other)
+                else:
+                    conflicted.discard(other)
+            if cost < best:
+                best = cost
+                yield dict(solution), cost
+
+    def search(self, cost):
+        self.nodes += 1
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise _OutOfTime()
+        if len(self.assigned) == len(self.counts):
+            self.best = cost
+            yield dict(self.assigned), cost
+            return
+
+        var = self.selectVariable()
+        counts = self.counts[var]
+        for value in sorted(counts, key=counts.get):
+            newCost = cost + counts[value]
+            if newCost >= self.best:
+                break # values are sorted by cost, so the rest cannot do better
+            changes = self.assign(var, value)
+            try:
+                if newCost + self.lowerBound() < self.best:
+                    for result in self.search(newCost):
+                        yield result
+            finally: # also undoes the path when the caller stops early
+                self.unassign(var, changes)
+            if self.best == 0:
+                return
+
+
+"""
+anytime solve
+branch and bound over the constraints of csp, all treated as soft; domains stay hard
+weights maps constraint objects to their cost when violated, 1 if not listed
+yields (solution, cost) each time a strictly cheaper complete assignment is found,
+ending when the last one is optimal or timeLimit seconds have passed
+a greedy assignment comes first, then up to localSearchSteps min-conflicts moves
+(20 per variable by default) before the exhaustive search
+"""
+
+
+def anytime_solve(csp, weights=None, timeLimit=None, localSearchSteps=None, seed=0):
+    if any(len(domain) == 0 for domain in csp.varDomains.values()):
+        return
+    deadline = None if timeLimit is None else time.perf_counter() + timeLimit
+    search = _BranchAndBound(csp, weights or {}, deadline)
+    if localSearchSteps is None:
+        localSearchSteps = 20 * len(csp.varDomains)
+    try:
+        # the first leaf of the search is a greedy assignment; local search tightens
+        # the bound from there before branch and bound takes over
+        first = search.search(0)
+        solution, cost = next(first)
+        first.close()
+        yield solution, cost
+        for solution, cost in search.improve(solution, cost, localSearchSteps, random.Random(seed)):
+            yield solution, cost
+        search.best = cost
+        if cost == 0:
+            return
+        for result in search.search(0):
+            yield result
+    except _OutOfTime:
+        return
+
+
+"""
+best assignment
+runs anytime_solve to the end and returns its last (solution, cost), or (None, None)
+"""
+
+
+def best_assignment(csp, weights=None, timeLimit=None):
+    best = (None, None)
+    for best in anytime_solve(csp, weights, timeLimit):
+        pass
+    return best
@@ -0,0 +1,164 @@
+# partition.py
+# Divide and conquer for maps too large for one search: the constraint graph
+# is cut into balanced pieces with few cut edges, the pieces are solved in
+# parallel worker processes, and conflicts on the cut edges are repaired by
+# re-solving only their neighbourhoods.
+import math
+import multiprocessing
+from collections import deque
+
+import BinaryCSP
+from batch import init_worker
+from incremental import repair_solution
+
+
+def _adjacency(csp):
+    adjacency = dict((var, set()) for var in csp.variables)
+    for constraint in csp.binaryConstraints:
+        if constraint.var1 != constraint.var2:
+            adjacency[constraint.var1].add(constraint.var2)
+            adjacency[constraint.var2].add(constraint.var1)
+    return adjacency
+
+
+"""
+partition graph
+splits the variables into parts pieces of near equal size: each piece is grown
+breadth first from an unplaced variable, preferring frontier variables with
+the most neighbours already inside, then boundary variables are moved to the
+neighbouring piece holding more of their neighbours while sizes stay within
+imbalance of the target
+returns {variable: piece number}
+"""
+
+
+def partition_graph(adjacency, parts, imbalance=0.05, passes=4):
+    variables = list(adjacency)
+    target = int(math.ceil(len(variables) / float(parts)))
+    piece = {}
+    sizes = []
+    for var in variables:
+        if var in piece:
+            continue
+        if sizes and sizes[-1] < target:
+            number = len(sizes) - 1 # top up a piece that ran out of connected variables
+        else:
+            number = len(sizes)
+            sizes.append(0)
+        inside = dict() # frontier variable -> neighbours already in the piece
+        frontier = deque([var])
+        inside[var] = 0
+        while frontier and sizes[number] < target:
+            best = max(frontier, key=inside.get) if len(frontier) < 64 else frontier[0]
+            frontier.remove(best)
+            piece[best] = number
+            sizes[number] += 1
+            for other in adjacency[best]:
+                if other not in piece:
+                    if other not in inside:
+                        inside[other] = 0
+                        frontier.append(other)
+                    inside[other] += 1
+
+    limit = int(target * (1 + imbalance)) + 1
+    for _ in range(passes):
+        moved = 0
+        for var in variables:
+            counts = {}
+            for other in adjacency[var]:
+                counts[piece[other]] = counts.get(piece[other], 0) + 1
+            own = counts.get(piece[var], 0)
+            best, gain = None, 0
+            for number, count in counts.items():
+                if number != piece[var] and count - own > gain and sizes[number] < limit:
+                    best, gain = number, count - own
+            if best is not None:
+                sizes[piece[var]] -= 1
+                sizes[best] += 1
+                piece[var] = best
+                moved += 1
+        if not moved:
+            break
+    return piece
+
+
+def _piece_csp(csp, members):
+    variables = [var for var in csp.variables if var in members]
+    binary = [c for c in csp.binaryConstraints if c.var1 in members and c.var2 in members]
+    unary = [c for c in csp.unaryConstraints if c.var in members]
+    return BinaryCSP.ConstraintSatisfactionProblem(variables, [csp.varDomains[var] for var in variables], binary, unary)
+
+
+def _solve_piece(task):
+    csp, solveArgs = task
+    return BinaryCSP.solve(csp, **solveArgs)
+
+
+def _greedy_fix(csp, solution, neighbours):
+    """
+    Gives each variable on a violated constraint a value that agrees with all of
+    its neighbours, where one exists. Returns the number of variables fixed.
+    """
+    fixed = 0
+    for violation in BinaryCSP.violatedConstraints(csp, solution):
+        if not isinstance(violation, BinaryCSP.BinaryConstraint):
+            continue
+        for var in (violation.var2, violation.var1):
+            if violation.isSatisfied(solution[violation.var1], solution[violation.var2]):
+                break # an earlier fix already settled this constraint
+            for value in csp.varDomains[var]:
+                if all(constraint.isSatisfiedFor(var, value, solution[other])
+                       for other, constraint in neighbours[var] if other != var):
+                    solution[var] = value
+                    fixed += 1
+                    break
+    return fixed
+
+
+"""
+partitioned solve
+solves csp by pieces of about pieceSize variables (or parts pieces) in a pool
+of processes, then repairs the cut edges: first by recolouring an endpoint
+greedily, then with repair_solution on the neighbourhoods still in conflict
+solveArgs go to BinaryCSP.solve for the pieces and the repair, so they must be
+picklable module-level functions
+returns (solution, report); solution is None if a piece or the whole problem
+is unsatisfiable
+"""
+
+
+def partitioned_solve(csp, parts=None, pieceSize=2000, processes=None, maxRadius=2, **solveArgs):
+    solveArgs.setdefault('inferenceMethod', BinaryCSP.forwardChecking)
+    adjacency = _adjacency(csp)
+    parts = parts or max(1, int(math.ceil(len(csp.variables) / float(pieceSize))))
+    piece = partition_graph(adjacency, parts)
+
+    members = {}
+    for var, number in piece.items():
+        members.setdefault(number, set()).add(var)
+    cut = sum(1 for c in csp.binaryConstraints if piece[c.var1] != piece[c.var2])
+    report = {'parts': len(members), 'sizes': sorted(len(m) for m in members.values()), 'cutEdges': cut,
+              'conflicts': 0, 'greedyFixed': 0, 'repair': None}
+
+    tasks = [(_piece_csp(csp, members[number]), solveArgs) for number in sorted(members)]
+    solution = {}
+    if processes == 1 or len(tasks) == 1:
+        partials = map(_solve_piece, tasks)
+        for partial in partials:
+            if partial is None:
+                return None, report
+            solution.update(partial)
+    else:
+        with multiprocessing.Pool(processes, initializer=init_worker) as pool:
+            for partial in pool.imap_unordered(_solve_piece, tasks):
+                if partial is None:
+                    return None, report
+                solution.update(partial)
+
+    neighbours = BinaryCSP.constraintNeighbours(csp)
+    report['conflicts'] = sum(1 for c in csp.binaryConstraints
+                              if piece[c.var1] != piece[c.var2] and not c.isSatisfied(solution[c.var1], solution[c.var2]))
+    if report['conflicts']:
+        report['greedyFixed'] = _greedy_fix(csp, solution, neighbours)
+    solution, report['repair'] = repair_solution(csp, solution, (), maxRadius, **solveArgs)
+    return solution, report
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# server.py
+# Asyncio front end that shares a pool of warm solver processes between clients.
+#
+# Protocol: one JSON object per line in each direction.
+#   {"op": "solve", "id": ..., "csp": "<csp_parse text>", "options": {...}, "deadline": seconds}
+#   {"op": "cancel", "id": ...}
+#   {"op": "stats"}
+# Every solve gets exactly one reply carrying its id and a batch.solve_lines status.
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import time
+
+import batch
+
+
+"""
+worker state
+the job the worker is running, read by the cancel signal handler
+"""
+_running = {'job': None, 'cancelled': None}
+
+
+def _on_cancel(signum, frame):
+    # only interrupt the job the server asked to cancel, never a later one
+    job = _running['job']
+    if job is not None and job == _running['cancelled'].value:
+        raise batch.SolveCancelled()
+
+
+def _serve_jobs(conn, cancelled):
+    batch.init_worker()
+    _running['cancelled'] = cancelled
+    signal.signal(signal.SIGUSR1, _on_cancel)
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        try:
+            _running['job'] = job['job']
+            record = batch.solve_lines(job['csp'].splitlines(True), job['options'], job['timeout'])
+        except batch.SolveCancelled:
+            record = {'status': 'cancelled'}
+        finally:
+            _running['job'] = None
+        conn.send(record)
+
+
+class SolverWorker(object):
+    """
+    One warm solver process and the pipe used to talk to it.
+    """
+
+    def __init__(self):
+        self.conn, child = multiprocessing.Pipe()
+        self.cancelled = multiprocessing.Value('q', -1, lock=False)
+        self.process = multiprocessing.Process(target=_serve_jobs, args=(child, self.cancelled), daemon=True)
+        self.process.start()
+        child.close()
+        self.job = None
+
+    async def run(self, job):
+        """
+        Send a job and wait for its record without blocking the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        self.job = job['job']
+        loop.add_reader(self.conn.fileno(), lambda: ready.done() or ready.set_result(None))
+        try:
+            self.conn.send(job)
+            await ready
+            return self.conn.recv()
+        finally:
+            loop.remove_reader(self.conn.fileno())
+            self.job = None
+
+    def cancel(self, job):
+        """
+        Interrupt the backtracking search of job if this worker is still running it.
+        """
+        if self.job == job:
+            self.cancelled.value = job
+            os.kill(self.process.pid, signal.SIGUSR1)
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (OSError, EOFError):
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class SolverPool(object):
+    """
+    Bounded pool of SolverWorkers with a request queue, deadlines,
+    cancellation and latency metrics.
+    """
+
+    def __init__(self, processes=None, maxQueue=1024, window=1000):
+        self.workers = [SolverWorker() for _ in range(processes or os.cpu_count() or 1)]
+        self.idle = asyncio.Queue()
+        for worker in self.workers:
+            self.idle.put_nowait(worker)
+        self.maxQueue = maxQueue
+        self.waiting = 0
+        self.active = {}
+        self.cancelled = set()
+        self.counts = collections.Counter()
+        self.queueLatency = collections.deque(maxlen=window)
+        self.solveLatency = collections.deque(maxlen=window)
+        self.jobIds = itertools.count()
+
+    async def solve(self, text, options=None, deadline=None, key=None):
+        """
+        Queue one CSP and return its result record.
+        key identifies the request for cancel(); deadline is in seconds from now
+        and covers both the time spent queued and the search itself.
+        """
+        if self.waiting >= self.maxQueue:
+            self.counts['rejected'] += 1
+            return {'status': 'rejected', 'error': 'queue full'}
+
+        job = next(self.jobIds)
+        arrived = time.perf_counter()
+        expires = arrived + deadline if deadline else None
+        getter = asyncio.ensure_future(self.idle.get())
+        self.active[key] = (job, None, getter)
+        self.waiting += 1
+        try:
+            try:
+                await asyncio.wait({getter}, timeout=expires - arrived if expires else None)
+            finally:
+                self.waiting -= 1
+            started = time.perf_counter()
+            if not getter.done():
+                getter.cancel()
+                return self._finish({'status': 'timeout', 'seconds': 0.0}, arrived, started)
+            if getter.cancelled() or key in self.cancelled:
+                if not getter.cancelled():
+                    self.idle.put_nowait(getter.result())
+                return self._finish({'status': 'cancelled', 'seconds': 0.0}, arrived, started)
+
+            worker = getter.result()
+            self.active[key] = (job, worker, None)
+            try:
+                record = await worker.run({'job': job, 'csp': text, 'options': options or {},
+                                           'timeout': max(expires - started, 1e-3) if expires else None})
+            except (EOFError, OSError) as error:
+                # the process died mid-solve, replace it so the pool keeps its size
+                self.workers.remove(worker)
+                worker = SolverWorker()
+                self.workers.append(worker)
+                record = {'status': 'error', 'error': 'worker died: {}'.format(error)}
+            self.idle.put_nowait(worker)
+            return self._finish(record, arrived, started)
+        finally:
+            self.active.pop(key, None)
+            self.cancelled.discard(key)
+
+    def cancel(self, key):
+        """
+        Cancel a queued or running request. Returns False if it is unknown.
+        """
+        if key not in self.active:
+            return False
+        job, worker, getter = self.active[key]
+        self.cancelled.add(key)
+        if worker is not None:
+            worker.cancel(job)
+        else:
+            getter.cancel()
+        return True
+
+    def _finish(self, record, arrived, started):
+        self.counts[record['status']] += 1
+        self.queueLatency.append(started - arrived)
+        self.solveLatency.append(time.perf_counter() - started)
+        return record
+
+    def stats(self):
+        return {
+            'workers': len(self.workers),
+            'idle': self.idle.qsize(),
+            'queueDepth': self.waiting,
+            'running': sum(1 for _, worker, _ in self.active.values() if worker is not None),
+            'counts': dict(self.counts),
+            'queueLatency': _summary(self.queueLatency),
+            'solveLatency': _summary(self.solveLatency),
+        }
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+def _summary(samples):
+    if not samples:
+        return {'n': 0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {'n': len(ordered), 'mean': sum(ordered) / len(ordered),
+            'p50': pick(0.5), 'p95': pick(0.95), 'max': ordered[-1]}
+
+
+class SolverServer(object):
+    """
+    Accepts newline-delimited JSON requests over a Unix or TCP socket.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def handle(self, reader, writer):
+        pending = set()
+        autoIds = itertools.count()
+        lock = asyncio.Lock()
+
+        async def reply(message):
+            async with lock:
+                writer.write((json.dumps(message) + '\n').encode())
+                await writer.drain()
+
+        async def solve(request):
+            key = (id(writer), request['id'])
+            record = await self.pool.solve(request.get('csp', ''), request.get('options'),
+                                           request.get('deadline'), key)
+            record['id'] = request.get('id')
+            await reply(record)
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    await reply({'status': 'error', 'error': 'bad request: {}'.format(error)})
+                    continue
+                op = request.get('op', 'solve')
+                if op == 'solve':
+                    request.setdefault('id', 'auto-{}'.format(next(autoIds)))
+                    task = asyncio.ensure_future(solve(request))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                elif op == 'cancel':
+                    found = self.pool.cancel((id(writer), request.get('id')))
+                    await reply({'id': request.get('id'), 'op': 'cancel', 'found': found})
+                elif op == 'stats':
+                    await reply(dict(self.pool.stats(), op='stats'))
+                else:
+                    await reply({'status': 'error', 'error': 'unknown op {!r}'.format(op)})
+        finally:
+            # a client that hangs up no longer wants its answers
+            for key in [key for key in self.pool.active if key[0] == id(writer)]:
+                self.pool.cancel(key)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    async def start(self, unixPath=None, host='127.0.0.1', port=0):
+        if unixPath:
+            return await asyncio.start_unix_server(self.handle, path=unixPath)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(unixPath=None, host='127.0.0.1', port=8765, processes=None, maxQueue=1024):
+    pool = SolverPool(processes, maxQueue)
+    server = await SolverServer(pool).start(unixPath, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the CSP solver over a local socket.')
+    parser.add_argument('--unix', help='Unix socket path (default: TCP)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('-j', '--processes', type=int, default=None)
+    parser.add_argument('--max-queue', type=int, default=1024)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.unix, args.host, args.port, args.processes, args.max_queue))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# test_cache.py
+# cached_solve returns what BinaryCSP.solve returns, with or without statistics,
+# and cached unsatisfiable entries are only returned for the CSP they belong to.
+import BinaryCSP
+import benchmark
+import cache
+
+
+def test_cached_solve_with_statistics():
+    csp = benchmark.planar_map(20, 4)
+    store = cache.SolutionCache()
+    solution, stats = cache.cached_solve(csp, store, statistics=True)
+    assert not BinaryCSP.violatedConstraints(csp, solution) and stats.nodes > 0
+    again, hitStats = cache.cached_solve(csp, store, statistics=True)
+    assert again == solution and isinstance(hitStats, BinaryCSP.SearchStatistics) and hitStats.nodes == 0
+    assert cache.cached_solve(csp, store) == solution
+
+
+def test_cached_solve_without_statistics():
+    csp = benchmark.planar_map(15, 4, seed=1)
+    store = cache.SolutionCache()
+    solution = cache.cached_solve(csp, store)
+    assert cache.cached_solve(csp, store, statistics=True)[0] == solution
+
+
+def unsatisfiable_map():
+    return benchmark.colouring_csp(range(4), [(a, b) for a in range(4) for b in range(a + 1, 4)], 3)
+
+
+def test_unsatisfiable_entries_are_checked(tmp_path):
+    unsat, other = unsatisfiable_map(), benchmark.planar_map(10, 4)
+    path = str(tmp_path / 'cache.sqlite')
+    store = cache.SolutionCache(path=path)
+    assert cache.cached_solve(unsat, store) is None
+    assert store.get(unsat) == (True, None)
+    key = cache.canonical_hash(unsat)
+    assert store.get(other, key) == (False, None) # as if other collided with unsat's key
+    assert store.hits['invalid'] == 1 and key not in store.memory
+
+    store.put(unsat, None)
+    fresh = cache.SolutionCache(path=path) # only the disk tier has it now
+    assert fresh.get(unsat) == (True, None) and fresh.hits['disk'] == 1
+    fresh.db.execute('UPDATE solutions SET body = ?', ('"unsatisfiable"',)) # an entry with no check stored
+    fresh.db.commit()
+    fresh.memory.clear()
+    assert fresh.get(unsat) == (False, None) and fresh.hits['invalid'] == 1
+    fresh.close()
+    store.close()
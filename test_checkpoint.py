@@ -0,0 +1,76 @@
+# test_checkpoint.py
+# The checkpointed iterative search: saving and resuming mid-search, matching
+# the recursive search, and refusing checkpoints it cannot resume.
+import random
+
+import BinaryCSP
+import checkpoint
+
+
+def colouring_csp(n, colours, seed=0):
+    rng = random.Random(seed)
+    edges = set()
+    while len(edges) < 2 * n:
+        a, b = rng.sample(range(n), 2)
+        edges.add((min(a, b), max(a, b)))
+    constraints = [BinaryCSP.NotEqualConstraint(a, b) for a, b in sorted(edges)]
+    unary = [BinaryCSP.BadValueConstraint(rng.randrange(n), rng.randrange(colours)) for _ in range(n)]
+    return BinaryCSP.ConstraintSatisfactionProblem(range(n), [set(range(colours)) for _ in range(n)], constraints, unary)
+
+
+def test_resumed_search_finds_the_recursive_solution(tmp_path):
+    csp = colouring_csp(12, 5, seed=3)
+    search = checkpoint.IterativeSearch(csp)
+    for _ in range(5):
+        search.step()
+    assert search.stack
+    path = str(tmp_path / 'search.ckpt')
+    search.save(path)
+    resumed = checkpoint.IterativeSearch.load(csp, path)
+    assert resumed.assignment.varDomains == search.assignment.varDomains
+    assert resumed.run()
+    assert resumed.solution() == BinaryCSP.solve(csp, inferenceMethod=BinaryCSP.forwardChecking)
+
+
+def test_checkpointed_search_matches_recursive_search_with_backtracking(tmp_path):
+    backtracks = 0
+    for seed in range(10):
+        csp = colouring_csp(14, 4, seed=seed)
+        path = str(tmp_path / ('search%d.ckpt' % seed))
+        search = checkpoint.IterativeSearch(csp)
+        steps = 0
+        while not search.step():
+            steps += 1
+            if steps % 7 == 0: # resume from a checkpoint every few steps
+                search.save(path)
+                search = checkpoint.IterativeSearch.load(csp, path)
+        assert search.solution() == BinaryCSP.solve(csp, inferenceMethod=BinaryCSP.forwardChecking)
+        backtracks += search.statistics.backtracks
+    assert backtracks > 0
+
+
+def test_checkpoint_refuses_a_different_csp(tmp_path):
+    path = str(tmp_path / 'search.ckpt')
+    search = checkpoint.IterativeSearch(colouring_csp(12, 5, seed=4))
+    search.step()
+    search.save(path)
+    try:
+        checkpoint.IterativeSearch.load(colouring_csp(12, 5, seed=5), path)
+    except ValueError as error:
+        assert 'different CSP' in str(error)
+    else:
+        assert False, 'restored a checkpoint written for a different CSP'
+
+
+def test_checkpoint_refuses_different_methods(tmp_path):
+    csp = colouring_csp(12, 5, seed=4)
+    path = str(tmp_path / 'search.ckpt')
+    search = checkpoint.IterativeSearch(csp)
+    search.step()
+    search.save(path)
+    try:
+        checkpoint.IterativeSearch.load(csp, path, inferenceMethod=BinaryCSP.noInferences)
+    except ValueError as error:
+        assert 'methods' in str(error)
+    else:
+        assert False, 'restored a checkpoint written with different methods'
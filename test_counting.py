@@ -0,0 +1,94 @@
+# test_counting.py
+# count_solutions against brute force and the backtracking counter on small
+# random maps, with table and unary constraints and disconnected components.
+import itertools
+import random
+
+import BinaryCSP
+import counting
+
+
+def random_map(n, colours, seed, tables=0, unary=0, pieces=1):
+    """
+    pieces separate random maps over n variables in all, plus tables random
+    TableConstraints and unary random Good/Bad value constraints.
+    """
+    rng = random.Random(seed)
+    variables = list(range(n))
+    constraints = []
+    size = max(2, n // pieces)
+    for start in range(0, n, size):
+        piece = variables[start:start + size]
+        for a, b in zip(piece, piece[1:]): # keep the piece connected
+            constraints.append(BinaryCSP.NotEqualConstraint(a, b))
+        for _ in range(len(piece)):
+            a, b = rng.choice(piece), rng.choice(piece)
+            if a != b:
+                constraints.append(BinaryCSP.NotEqualConstraint(a, b))
+    values = list(range(1, colours + 1))
+    for _ in range(tables):
+        a, b = rng.sample(variables, 2)
+        pairs = [(x, y) for x in values for y in values if rng.random() < 0.6]
+        constraints.append(BinaryCSP.TableConstraint(a, b, *pairs))
+    unaries = []
+    for _ in range(unary):
+        kind = rng.choice((BinaryCSP.GoodValueConstraint, BinaryCSP.BadValueConstraint))
+        unaries.append(kind(rng.choice(variables), rng.choice(values)))
+    return BinaryCSP.ConstraintSatisfactionProblem(variables, [set(values) for _ in variables], constraints, unaries)
+
+
+def brute_force_count(csp):
+    """
+    Checks every combination of domain values; the reference the counters are compared against.
+    """
+    variables = list(csp.varDomains)
+    total = 0
+    for values in itertools.product(*[list(csp.varDomains[var]) for var in variables]):
+        if not BinaryCSP.violatedConstraints(csp, dict(zip(variables, values))):
+            total += 1
+    return total
+
+
+def check(csp):
+    expected = brute_force_count(csp)
+    assert counting.count_solutions(csp) == expected
+    assert BinaryCSP.countSolutions(csp) == expected
+    return expected
+
+
+def test_plain_maps():
+    for seed in range(15):
+        check(random_map(7, 3, seed))
+
+
+def test_disconnected_maps_use_the_component_cache():
+    counts, hits = [], 0
+    for seed in range(10):
+        csp = random_map(10, 3, seed, unary=1, pieces=2) # the unary constraint rules out renaming values
+        counts.append(check(csp))
+        counter = counting.ComponentCounter(csp)
+        counter.count()
+        assert counter.misses > 0
+        hits += counter.hits
+    assert any(counts) and hits > 0
+
+
+def test_table_constraints():
+    for seed in range(15):
+        check(random_map(6, 3, seed, tables=3))
+
+
+def test_good_and_bad_value_constraints():
+    for seed in range(15):
+        check(random_map(7, 3, seed, unary=3))
+
+
+def test_everything_together():
+    for seed in range(15):
+        check(random_map(8, 3, seed, tables=2, unary=2, pieces=2))
+
+
+def test_small_cache_still_counts_exactly():
+    csp = random_map(9, 3, 4, pieces=3)
+    expected = brute_force_count(csp)
+    assert counting.count_solutions(csp, maxEntries=2) == expected
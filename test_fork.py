@@ -0,0 +1,73 @@
+# test_fork.py
+# Copy-on-write forks of an Assignment: isolation, copying only what a branch
+# changes, and forks that copy nothing at all. benchmark.py --forks times them.
+import BinaryCSP
+import benchmark
+
+
+def preprocessed(n=60, seed=2):
+    csp = benchmark.planted_colourable(n, 4, seed=seed, degree=5)
+    base = BinaryCSP.AC3(BinaryCSP.eliminateUnaryConstraints(BinaryCSP.Assignment(csp), csp), csp)
+    return csp, base
+
+
+def test_fork_isolates_both_sides():
+    csp, base = preprocessed()
+    before = dict((var, set(domain)) for var, domain in base.varDomains.items())
+    child = base.fork()
+    child.varDomains[0].discard(1)
+    child.assignedValues[0] = 2
+    base.varDomains[1].discard(2)
+    base.assignedValues[1] = 3
+    assert 1 in base.varDomains[0] and base.assignedValues[0] is None
+    assert 2 in child.varDomains[1] and child.assignedValues[1] is None
+    grandchild = child.fork()
+    assert grandchild.assignedValues[0] == 2 and 1 not in grandchild.varDomains[0]
+    assert sorted(grandchild.varDomains) == sorted(before) and len(grandchild.assignedValues) == len(before)
+
+
+def test_read_only_paths_copy_nothing():
+    csp, base = preprocessed()
+    child = base.fork()
+    var = BinaryCSP.minimumRemainingValuesHeuristic(child, csp)
+    BinaryCSP.leastConstrainingValuesHeuristic(child, csp, var)
+    BinaryCSP.orderValues(child, csp, var)
+    BinaryCSP.consistent(child, csp, var, 1)
+    assert len(child.varDomains.own) == 0
+
+
+def test_decision_copies_only_the_domains_it_prunes():
+    csp, base = preprocessed()
+    child = base.fork()
+    var = BinaryCSP.minimumRemainingValuesHeuristic(child, csp)
+    value = BinaryCSP.orderValues(child, csp, var)[0]
+    inferences = BinaryCSP.forwardChecking(child, csp, var, value)
+    assert set(child.varDomains.own) == set(pruned for pruned, _ in inferences)
+
+
+def test_search_from_forks_matches_a_fresh_search():
+    csp, base = preprocessed()
+    fresh = BinaryCSP.solve(csp, inferenceMethod=BinaryCSP.forwardChecking)
+    for _ in range(3):
+        child = base.fork()
+        result = BinaryCSP.recursiveBacktrackingWithInferences(child, csp, BinaryCSP.leastConstrainingValuesHeuristic,
+                                                               BinaryCSP.minimumRemainingValuesHeuristic,
+                                                               BinaryCSP.forwardChecking)
+        assert result.extractSolution() == fresh
+    assert len(base.varDomains.own) == 0
+
+
+def test_fork_copies_nothing():
+    csp, base = preprocessed()
+    domains, values = dict(base.varDomains), dict(base.assignedValues)
+    child = base.fork()
+    for side in (base, child):
+        assert len(side.varDomains.own) == 0 and len(side.assignedValues.own) == 0
+        assert len(side.varDomains.shared) == 0 # nothing read through yet either
+        assert all(side.varDomains.peek(var) is domains[var] for var in domains)
+        assert all(side.assignedValues.peek(var) is values[var] for var in values)
+    child.varDomains[0].discard(1) # copies domain 0 into the child only
+    grandchild = child.fork()
+    assert len(grandchild.varDomains.own) == 0
+    assert grandchild.varDomains.peek(0) is child.varDomains.peek(0) is not domains[0]
+    assert all(grandchild.varDomains.peek(var) is domains[var] for var in domains if var != 0)
@@ -0,0 +1,71 @@
+# test_intervals.py
+# Interval domains through the callers of a value ordering: incremental repair
+# and the checkpointed iterative search, which must never expand them.
+import random
+
+import BinaryCSP
+import checkpoint
+import incremental
+
+
+def interval_csp(n, width, seed=0):
+    rng = random.Random(seed)
+    edges = set()
+    while len(edges) < 2 * n:
+        a, b = rng.sample(range(n), 2)
+        edges.add((min(a, b), max(a, b)))
+    constraints = [BinaryCSP.NotEqualConstraint(a, b) for a, b in sorted(edges)]
+    unary = [BinaryCSP.BadValueConstraint(rng.randrange(n), rng.randrange(width)) for _ in range(n)]
+    domains = [BinaryCSP.IntervalDomain([(0, width - 1)]) for _ in range(n)]
+    return BinaryCSP.ConstraintSatisfactionProblem(range(n), domains, constraints, unary)
+
+
+def test_interval_values_behave_like_a_list():
+    values = BinaryCSP.IntervalValues([(5, 9), (1, 2)])
+    reference = [5, 6, 7, 8, 9, 1, 2]
+    values.remove(7)
+    reference.remove(7)
+    values.insert(2, 100)
+    reference.insert(2, 100)
+    assert values.pop(0) == reference.pop(0)
+    assert values.pop() == reference.pop()
+    assert list(values) == reference and len(values) == len(reference)
+    assert 100 in values and 7 not in values
+
+
+def test_repair_full_solve_on_interval_domains():
+    csp = interval_csp(8, 4, seed=1)
+    solution, report = incremental.repair_solution(csp, dict((var, 0) for var in csp.variables))
+    assert report['fullSolve']
+    assert solution is not None and not BinaryCSP.violatedConstraints(csp, solution)
+
+
+def test_repair_prefers_previous_values_on_interval_domains():
+    csp = interval_csp(30, 1000, seed=2)
+    solution = BinaryCSP.solve(csp, inferenceMethod=BinaryCSP.forwardChecking)
+    broken = dict(solution)
+    a, b = csp.binaryConstraints[0].var1, csp.binaryConstraints[0].var2
+    broken[a] = broken[b]
+    repaired, report = incremental.repair_solution(csp, broken, inferenceMethod=BinaryCSP.forwardChecking)
+    assert not BinaryCSP.violatedConstraints(csp, repaired)
+    assert report['changed'] <= 2
+
+
+def test_checkpoint_and_hash_never_expand_interval_domains(tmp_path, monkeypatch):
+    csp = interval_csp(12, 10 ** 9, seed=3)
+    search = checkpoint.IterativeSearch(csp)
+    for _ in range(5):
+        search.step()
+    assert all(isinstance(frame.values, BinaryCSP.IntervalValues) for frame in search.stack)
+
+    def expand(domain):
+        raise AssertionError('expanded %r' % (domain,))
+    monkeypatch.setattr(BinaryCSP.IntervalDomain, '__iter__', expand)
+    path = str(tmp_path / 'search.ckpt')
+    search.save(path)
+    resumed = checkpoint.IterativeSearch.load(csp, path)
+    assert resumed.assignment.varDomains == search.assignment.varDomains
+    assert len(resumed.stack) == len(search.stack)
+    monkeypatch.undo()
+    assert resumed.run()
+    assert resumed.solution() == BinaryCSP.solve(csp, inferenceMethod=BinaryCSP.forwardChecking)
@@ -0,0 +1,47 @@
+# test_maxcsp.py
+# anytime_solve and best_assignment against exhaustive enumeration on small
+# weighted, over-constrained colourings.
+import itertools
+import random
+
+import BinaryCSP
+import maxcsp
+
+
+def over_constrained(n, colours, seed):
+    rng = random.Random(seed)
+    pairs = list(itertools.combinations(range(n), 2))
+    constraints = [BinaryCSP.NotEqualConstraint(a, b) for a, b in rng.sample(pairs, 2 * len(pairs) // 3)]
+    unary = [BinaryCSP.GoodValueConstraint(rng.randrange(n), rng.randrange(colours)) for _ in range(2)] + \
+        [BinaryCSP.BadValueConstraint(rng.randrange(n), rng.randrange(colours)) for _ in range(2)]
+    csp = BinaryCSP.ConstraintSatisfactionProblem(range(n), [set(range(colours)) for _ in range(n)], constraints, unary)
+    weights = dict((constraint, rng.randint(1, 5)) for constraint in constraints + unary if rng.random() < 0.7)
+    return csp, weights
+
+
+def cost(csp, weights, solution):
+    return sum(weights.get(constraint, 1) for constraint in BinaryCSP.violatedConstraints(csp, solution))
+
+
+def exhaustive_optimum(csp, weights):
+    variables = list(csp.variables)
+    return min(cost(csp, weights, dict(zip(variables, values)))
+               for values in itertools.product(*(sorted(csp.varDomains[var]) for var in variables)))
+
+
+def test_best_assignment_matches_exhaustive_enumeration():
+    for seed in range(15):
+        csp, weights = over_constrained(7, 3, seed)
+        solution, best = maxcsp.best_assignment(csp, weights)
+        assert best == exhaustive_optimum(csp, weights) > 0
+        assert cost(csp, weights, solution) == best
+
+
+def test_anytime_costs_improve_to_the_optimum():
+    csp, weights = over_constrained(8, 3, 1)
+    costs = []
+    for solution, reported in maxcsp.anytime_solve(csp, weights, localSearchSteps=0):
+        assert cost(csp, weights, solution) == reported
+        costs.append(reported)
+    assert costs == sorted(costs, reverse=True) and len(set(costs)) == len(costs)
+    assert costs[-1] == exhaustive_optimum(csp, weights)
@@ -0,0 +1,94 @@
+# test_sac.py
+# singletonArcConsistency against a brute-force SAC fixpoint and brute-force
+# solution support on small pinned colourings, and its test and time budgets.
+import itertools
+import random
+
+import BinaryCSP
+
+
+def pinned_colouring(n, colours, seed):
+    rng = random.Random(seed)
+    edges = set()
+    while len(edges) < 3 * n // 2:
+        a, b = rng.sample(range(n), 2)
+        edges.add((min(a, b), max(a, b)))
+    constraints = [BinaryCSP.NotEqualConstraint(a, b) for a, b in sorted(edges)]
+    unary = [BinaryCSP.GoodValueConstraint(var, rng.randrange(colours)) for var in rng.sample(range(n), 2)]
+    return BinaryCSP.ConstraintSatisfactionProblem(range(n), [set(range(colours)) for _ in range(n)], constraints, unary)
+
+
+def arc_consistent(csp):
+    assignment = BinaryCSP.eliminateUnaryConstraints(BinaryCSP.Assignment(csp), csp)
+    return assignment and BinaryCSP.AC3(assignment, csp)
+
+
+def with_domains(csp, domains):
+    return BinaryCSP.ConstraintSatisfactionProblem(csp.variables, [set(domains[var]) for var in csp.variables],
+                                                  csp.binaryConstraints)
+
+
+def brute_force_sac(csp, domains):
+    """
+    The SAC closure by definition: drop any value whose singleton domain AC3 wipes out, until nothing changes.
+    """
+    domains = dict((var, set(domain)) for var, domain in domains.items())
+    changed = True
+    while changed:
+        changed = False
+        for var in csp.variables:
+            for value in sorted(domains[var]):
+                singleton = dict(domains)
+                singleton[var] = set([value])
+                if arc_consistent(with_domains(csp, singleton)) is None:
+                    domains[var].discard(value)
+                    changed = True
+        closed = arc_consistent(with_domains(csp, domains))
+        if closed is None:
+            return None
+        domains = dict((var, set(domain)) for var, domain in closed.varDomains.items())
+    return domains
+
+
+def solution_support(csp):
+    support = dict((var, set()) for var in csp.variables)
+    for values in itertools.product(*(sorted(csp.varDomains[var]) for var in csp.variables)):
+        solution = dict(zip(csp.variables, values))
+        if not BinaryCSP.violatedConstraints(csp, solution):
+            for var, value in solution.items():
+                support[var].add(value)
+    return support
+
+
+def test_sac_matches_brute_force():
+    beyondAC3 = 0
+    for seed in range(30):
+        csp = pinned_colouring(8, 3, seed)
+        ac = arc_consistent(csp)
+        if ac is None:
+            continue
+        before = dict((var, set(domain)) for var, domain in ac.varDomains.items())
+        result = BinaryCSP.singletonArcConsistency(ac, csp)
+        expected = brute_force_sac(csp, before)
+        support = solution_support(csp)
+        if result is None:
+            assert expected is None and not any(support.values())
+            continue
+        assert result.varDomains == expected
+        for var, values in support.items(): # SAC never removes a value used by a solution
+            assert values <= result.varDomains[var]
+        beyondAC3 += sum(len(before[var]) - len(result.varDomains[var]) for var in before)
+    assert beyondAC3 > 0
+
+
+def test_budgets_stop_early():
+    csp = next(csp for csp in (pinned_colouring(8, 3, seed) for seed in range(30))
+               if arc_consistent(csp) is not None and
+               BinaryCSP.singletonArcConsistency(arc_consistent(csp), csp) is None)
+    assert BinaryCSP.singletonArcConsistency(arc_consistent(csp), csp, maxTests=0) is not None
+    assert BinaryCSP.singletonArcConsistency(arc_consistent(csp), csp, timeLimit=0) is not None
+
+    _, stats = BinaryCSP.solve(csp, useSAC=True, sacMaxTests=0, statistics=True)
+    assert stats.preprocessingRemoved['singletonArcConsistency'] == 0
+    _, stats = BinaryCSP.solve(csp, useSAC=True, statistics=True)
+    assert 'singletonArcConsistency' not in stats.preprocessingRemoved # SAC failed the whole problem
@@ -0,0 +1,40 @@
+# test_sudoku.py
+# SudokuBitboard solving known puzzles, checked with the list-based is_consistent,
+# and batch.solve_sudoku agreeing between the bitboard and CSP engines.
+import types
+
+import batch
+import utils
+
+PUZZLE = '530070000600195000098000060800060003400803001700020006060000280000419005000080079'
+SOLUTION = '534678912672195348198342567859761423426853791713924856961537284287419635345286179'
+
+
+def test_bitboard_solves_a_known_puzzle():
+    board = utils.SudokuBitboard.from_record(PUZZLE)
+    assert board.solve() and board.is_solved()
+    solution = board.solution()
+    assert ''.join(solution['R%dC%d' % (row, column)] for row in range(9) for column in range(9)) == SOLUTION
+
+    sudoku = types.SimpleNamespace(related_cells=dict((cell, [board.cells[peer] for peer in peers])
+                                                      for cell, peers in zip(board.cells, board.peers)))
+    for cell, value in solution.items():
+        rest = dict(solution)
+        del rest[cell]
+        assert utils.is_consistent(sudoku, rest, cell, value)
+        assert not any(utils.is_consistent(sudoku, rest, cell, other) for other in '123456789' if other != value)
+
+
+def test_bitboard_rejects_clashing_clues():
+    assert not utils.SudokuBitboard.from_record('55' + '0' * 79).solve()
+
+
+def test_solve_sudoku_engines_agree():
+    for text in (PUZZLE, '1' + '0' * 48, '12' + '0' * 5 + '21' + '0' * 40):
+        bitboard = batch.solve_sudoku((0, text, None))
+        csp = batch.solve_sudoku((0, text, None), {'engine': 'csp'})
+        assert bitboard['status'] == csp['status']
+        if csp['status'] == 'solved':
+            board = utils.SudokuBitboard.from_record(bitboard['solution'])
+            assert board.solve() and board.solution() == dict(zip(board.cells, bitboard['solution']))
+    assert batch.solve_sudoku((0, PUZZLE, None))['solution'] == SOLUTION
@@ -0,0 +1,78 @@
+# test_vectorised.py
+# SolutionValidator counts against BinaryCSP.violatedConstraints, including
+# rows with missing and out-of-domain values, and notEqualAC3 against AC3.
+import random
+
+import numpy as np
+
+import BinaryCSP
+import benchmark
+import vectorised
+
+
+def test_missing_value_with_good_constraint_counts_once():
+    csp = BinaryCSP.ConstraintSatisfactionProblem(['A', 'B'], [set([1, 2]), set([1, 2])],
+                                                  [BinaryCSP.NotEqualConstraint('A', 'B')],
+                                                  [BinaryCSP.GoodValueConstraint('A', 1), BinaryCSP.BadValueConstraint('B', 1)])
+    rows = [{'B': 2}, {'A': 2, 'B': 1}, {'A': 1}, {'B': 1}]
+    validator = vectorised.SolutionValidator(csp)
+    expected = [len(BinaryCSP.violatedConstraints(csp, row)) for row in rows]
+    assert list(validator.violations(validator.encode(rows))) == expected == [1, 2, 1, 2]
+
+
+def test_out_of_domain_values_count_like_violated_constraints():
+    csp = BinaryCSP.ConstraintSatisfactionProblem(['a', 'b', 'c'], [set([1, 2])] * 3,
+                                                  [BinaryCSP.NotEqualConstraint('a', 'b'), BinaryCSP.NotEqualConstraint('b', 'c')],
+                                                  [BinaryCSP.GoodValueConstraint('a', 1), BinaryCSP.BadValueConstraint('c', 9)])
+    rows = [{'a': 7, 'b': 2}, {'a': 7, 'b': 7, 'c': 8}, {'a': 1, 'b': 8, 'c': 9}, {'a': 1, 'b': 2, 'c': 1}]
+    validator = vectorised.SolutionValidator(csp)
+    expected = [len(BinaryCSP.violatedConstraints(csp, row)) for row in rows]
+    assert list(validator.violations(validator.encode(rows))) == expected == [3, 5, 3, 0]
+
+
+def test_random_rows_match_violated_constraints(tmp_path):
+    rng = random.Random(0)
+    colouring = benchmark.planar_map(60, 4, seed=1)
+    unary = [BinaryCSP.GoodValueConstraint(rng.randrange(60), rng.randint(1, 4)) for _ in range(8)] + \
+        [BinaryCSP.BadValueConstraint(rng.randrange(60), rng.randint(1, 4)) for _ in range(8)]
+    domains = [set(range(1, 5)) if var % 5 else set(range(1, 4)) for var in colouring.variables]
+    csp = BinaryCSP.ConstraintSatisfactionProblem(colouring.variables, domains, colouring.binaryConstraints, unary)
+    rows = []
+    for _ in range(200):
+        row = dict((var, rng.randint(1, 4) if rng.random() < 0.95 else rng.randint(5, 6)) for var in csp.variables)
+        for var in rng.sample(csp.variables, rng.randrange(4)): # some variables left unassigned
+            del row[var]
+        rows.append(row)
+    validator = vectorised.SolutionValidator(csp)
+    matrix = validator.encode(rows)
+    expected = [len(BinaryCSP.violatedConstraints(csp, row)) for row in rows]
+    assert list(validator.violations(matrix)) == expected
+
+    path = str(tmp_path / 'rows.npy')
+    np.save(path, matrix)
+    chunks = list(validator.violations_chunked(vectorised.load_assignments(path), chunkRows=64))
+    assert len(chunks) == 4 and list(np.concatenate(chunks)) == expected
+
+
+
+def pinned(csp, pins):
+    assignment = BinaryCSP.Assignment(csp)
+    for var, value in pins.items():
+        assignment.varDomains[var].intersection_update([value])
+    return assignment
+
+
+def test_not_equal_ac3_matches_ac3():
+    rng = random.Random(0)
+    wipeouts = 0
+    for seed in range(60):
+        csp = benchmark.planar_map(30, 4, seed=seed)
+        pins = dict((var, rng.randint(1, 4)) for var in rng.sample(csp.variables, rng.randrange(1, 12)))
+        expected = BinaryCSP.AC3(pinned(csp, pins), csp)
+        actual = vectorised.notEqualAC3(pinned(csp, pins), csp)
+        if expected is None:
+            wipeouts += 1
+            assert actual is None
+        else:
+            assert actual is not None and actual.varDomains == expected.varDomains
+    assert 0 < wipeouts < 60 # both outcomes are covered
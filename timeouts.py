@@ -0,0 +1,36 @@
+# timeouts.py
+# SIGALRM deadlines for solves, shared by the batch workers and the benchmark
+# harness. Only usable from the main thread of a process.
+import signal
+
+
+class SolveTimeout(Exception):
+    """
+    Raised when a solve runs past its deadline.
+    """
+    pass
+
+
+def raise_timeout(signum, frame):
+    raise SolveTimeout()
+
+
+"""
+start alarm
+arms a SIGALRM deadline in seconds; a falsy timeout leaves it disarmed
+"""
+
+
+def start_alarm(timeout):
+    if timeout:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+
+"""
+stop alarm
+disarms any pending deadline
+"""
+
+
+def stop_alarm():
+    signal.setitimer(signal.ITIMER_REAL, 0)
@@ -1,5 +1,3 @@
-import sys
-
 """
 is_different
 checks if two cells are the same
@@ -38,18 +36,16 @@ checks if the value is consistent in the assignments
 
 
 def is_consistent(sudoku, assignment, cell, value):
-    is_consistent = True
-
-    # for each tuple of cell/value in assignment
-    for current_cell, current_value in assignment.items():
+    # only the related cells can clash, so look them up instead of walking the whole assignment
+    for related_c in sudoku.related_cells[cell]:
 
-        # if the values are the equal and the cells are related to each other
-        if current_value == value and current_cell in sudoku.related_cells[cell]:
+        # if a related cell already holds the value
+        if related_c in assignment and assignment[related_c] == value:
             # then cell is not consistent
-            is_consistent = False
+            return False
 
     # else is it consistent
-    return is_consistent
+    return True
 
 
 """
@@ -114,6 +110,230 @@ def forward_check(sudoku, cell, value, assignment):
                 sudoku.pruned[cell].append((related_c, value))
 
 
+"""
+sudoku bitboard
+the same helpers on bit masks: cells are numbered, each cell's possibilities are
+an int with bit i set while values[i] is possible, the related cells of each cell
+are a precomputed tuple of cell numbers, and an undo log replaces the pruned lists
+"""
+
+
+class SudokuBitboard(object):
+
+    def __init__(self, related_cells, possibilities):
+        self.cells = list(possibilities)
+        self.index = dict((cell, i) for i, cell in enumerate(self.cells))
+        self.values = sorted(set(value for values in possibilities.values() for value in values))
+        self.bits = dict((value, 1 << i) for i, value in enumerate(self.values))
+
+        # peers[i] holds the numbers of the cells related to cell i
+        self.peers = [tuple(self.index[related_c] for related_c in related_cells[cell] if related_c != cell)
+                      for cell in self.cells]
+        self.masks = [self.mask(possibilities[cell]) for cell in self.cells]
+        # bit of the assigned value per cell, 0 while unassigned
+        self.assigned = [0] * len(self.cells)
+        # (cell number, mask before the change), popped back to a mark on unassign
+        self.trail = []
+        self.marks = {}
+
+    @classmethod
+    def from_sudoku(cls, sudoku):
+        return cls(sudoku.related_cells, sudoku.possibilities)
+
+    @classmethod
+    def from_record(cls, record):
+        """
+        Board for one record from read_sudokus, with cells named R<row>C<column>
+        as in csp_io.sudoku_csp; clues start as cells with a single possibility.
+        """
+        side = sudoku_side(len(record))
+        symbols = SUDOKU_SYMBOLS[:side]
+        box = int(round(side ** 0.5))
+        if box * box != side:
+            # boards whose side is not a square (7x7) have no boxes
+            box = None
+
+        cells = [(row, column) for row in range(side) for column in range(side)]
+        related_cells = {}
+        possibilities = {}
+        for (row, column), symbol in zip(cells, record):
+            cell = 'R%dC%d' % (row, column)
+            related_cells[cell] = ['R%dC%d' % (r, c) for r, c in cells
+                                   if (r == row or c == column or
+                                       (box and (r // box, c // box) == (row // box, column // box)))
+                                   and (r, c) != (row, column)]
+            possibilities[cell] = [symbol] if symbol in symbols else list(symbols)
+        return cls(related_cells, possibilities)
+
+    def mask(self, values):
+        mask = 0
+        for value in values:
+            mask |= self.bits[value]
+        return mask
+
+    def possible_values(self, cell):
+        mask = self.masks[self.index[cell]]
+        return [value for value in self.values if mask & self.bits[value]]
+
+    def number_of_conflicts(self, cell, value):
+        bit = self.bits[value]
+        count = 0
+        for peer in self.peers[self.index[cell]]:
+            mask = self.masks[peer]
+            # not found yet (more than one bit set) and the value still possible
+            if mask & (mask - 1) and mask & bit:
+                count += 1
+        return count
+
+    def is_consistent(self, cell, value):
+        bit = self.bits[value]
+        assigned = self.assigned
+        for peer in self.peers[self.index[cell]]:
+            if assigned[peer] & bit:
+                return False
+        return True
+
+    def assign(self, cell, value, forward=True):
+        """
+        Returns False if forward checking emptied a related cell's possibilities.
+        """
+        i = self.index[cell]
+        self.marks[i] = len(self.trail)
+        self.assigned[i] = self.bits[value]
+        if forward:
+            return self.forward_check(i)
+        return True
+
+    def unassign(self, cell):
+        """
+        Undoes the latest assignment that is still in place, as backtracking does;
+        cells must be unassigned in the reverse order they were assigned.
+        """
+        i = self.index[cell]
+        if not self.assigned[i]:
+            return
+        mark = self.marks.pop(i)
+        trail, masks = self.trail, self.masks
+        while len(trail) > mark:
+            peer, mask = trail.pop()
+            masks[peer] = mask
+        self.assigned[i] = 0
+
+    def forward_check(self, i):
+        bit = self.assigned[i]
+        masks, assigned, trail = self.masks, self.assigned, self.trail
+        ok = True
+        for peer in self.peers[i]:
+            # unassigned related cells where the value remains possible
+            if not assigned[peer] and masks[peer] & bit:
+                trail.append((peer, masks[peer]))
+                masks[peer] &= ~bit
+                if not masks[peer]:
+                    ok = False
+        return ok
+
+    def solve(self):
+        """
+        Backtracking with forward checking, the cell with the fewest possible
+        values first. Returns True with every cell assigned, or False if the
+        board has no solution.
+        """
+        masks, assigned = self.masks, self.assigned
+        unassigned = [i for i in range(len(self.cells)) if not assigned[i]]
+        if not unassigned:
+            return True
+        i = min(unassigned, key=lambda i: bin(masks[i]).count('1'))
+        cell = self.cells[i]
+        for value in self.possible_values(cell):
+            if not self.is_consistent(cell, value):
+                continue
+            if self.assign(cell, value) and self.solve():
+                return True
+            self.unassign(cell)
+        return False
+
+    def solution(self):
+        """
+        {cell: value} for the assigned cells.
+        """
+        return dict((cell, self.values[bit.bit_length() - 1])
+                    for cell, bit in zip(self.cells, self.assigned) if bit)
+
+    def is_solved(self):
+        """
+        True if every cell is assigned and no two related cells share a value.
+        """
+        assigned = self.assigned
+        for i, bit in enumerate(assigned):
+            if not bit:
+                return False
+            for peer in self.peers[i]:
+                if assigned[peer] == bit:
+                    return False
+        return True
+
+
+"""
+sudoku symbols
+a record holds one character per cell: '0' or '.' for an empty cell, otherwise
+the value's symbol, the first side symbols being used on a side x side board
+"""
+SUDOKU_SYMBOLS = '123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def sudoku_side(size):
+    side = int(round(size ** 0.5))
+    if side * side != size or side > len(SUDOKU_SYMBOLS):
+        raise ValueError('a record of {} cells is not a supported square board'.format(size))
+    return side
+
+
+"""
+read sudokus
+streams records of size cells from a file object, chunk_size characters at a
+time, so that dumps larger than memory never have to be held at once
+records may run together or be split over lines; a newline always ends the
+current record, and other whitespace is ignored
+yields (index, record, error) with error None for a good record; a record cut
+short or holding characters outside the board's symbols yields an error message
+"""
+
+
+def read_sudokus(stream, size=49, chunk_size=1 << 16):
+    allowed = frozenset('0.' + SUDOKU_SYMBOLS[:sudoku_side(size)])
+    index = 0
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode('ascii', 'replace')
+
+        for position, piece in enumerate(chunk.split('\n')):
+            # a newline between pieces ends the record in progress
+            if position and pending:
+                yield index, pending, 'Error : the record has {} characters, not {}'.format(len(pending), size)
+                index += 1
+                pending = ''
+            pending += ''.join(piece.split())
+
+            start = 0
+            while len(pending) - start >= size:
+                record = pending[start:start + size]
+                start += size
+                bad = set(record) - allowed
+                if bad:
+                    yield index, record, 'Error : unexpected characters {}'.format(''.join(sorted(bad)))
+                else:
+                    yield index, record, None
+                index += 1
+            pending = pending[start:]
+
+    if pending:
+        yield index, pending, 'Error : the record has {} characters, not {}'.format(len(pending), size)
+
+
 """
 fetch sudokus
 fetches sudokus based on user's input
@@ -125,8 +345,8 @@ def fetch_sudokus(input):
 
     # if the input is an multiple of DEFAULT_SIZE=81
     if (len(input) % DEFAULT_SIZE) != 0:
-        print("Error : the string must be a multiple of {}".format(DEFAULT_SIZE))
-        sys.exit()
+        # raise rather than exit so that a caller reading many inputs can carry on
+        raise ValueError("Error : the string must be a multiple of {}".format(DEFAULT_SIZE))
 
     else:
         return [input[i:i + DEFAULT_SIZE] for i in range(0, len(input), DEFAULT_SIZE)]
@@ -0,0 +1,207 @@
+# vectorised.py
+# NumPy versions of whole-graph operations on NotEqual-only (map colouring) CSPs.
+# NumPy is optional: callers check available() and fall back to the pure-Python paths.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def available():
+    return np is not None
+
+
+class NotEqualArrays(object):
+    """
+    Array form of a NotEqual constraint graph: variables and values numbered in
+    a fixed order, and each constraint stored as two directed edges sorted by
+    source into CSR (indptr, indices).
+    """
+
+    def __init__(self, csp, variables=None):
+        self.variables = list(variables if variables is not None else csp.varDomains)
+        self.varIndex = dict((var, i) for i, var in enumerate(self.variables))
+        values = set()
+        for domain in csp.varDomains.values():
+            values.update(domain)
+        self.values = sorted(values, key=repr)
+        self.valueIndex = dict((value, j) for j, value in enumerate(self.values))
+
+        count = len(csp.binaryConstraints)
+        src = np.empty(2 * count, dtype=np.int64)
+        dst = np.empty(2 * count, dtype=np.int64)
+        for e, constraint in enumerate(csp.binaryConstraints):
+            a, b = self.varIndex[constraint.var1], self.varIndex[constraint.var2]
+            src[2 * e], dst[2 * e] = a, b
+            src[2 * e + 1], dst[2 * e + 1] = b, a
+        order = np.argsort(src, kind='stable')
+        self.src = src[order]
+        self.indices = dst[order]
+        self.indptr = np.zeros(len(self.variables) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.src, minlength=len(self.variables)), out=self.indptr[1:])
+
+    def domainMatrix(self, varDomains):
+        """
+        Boolean V x d matrix with True where the value is still in the variable's domain.
+        """
+        matrix = np.zeros((len(self.variables), len(self.values)), dtype=bool)
+        for i, var in enumerate(self.variables):
+            for value in varDomains[var]:
+                matrix[i, self.valueIndex[value]] = True
+        return matrix
+
+    def outgoingEdges(self, rows):
+        """
+        Positions in indices of every edge leaving the given rows, gathered without a Python loop.
+        """
+        starts = self.indptr[rows]
+        counts = self.indptr[rows + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        firsts = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        return firsts + np.arange(total)
+
+
+"""
+not equal AC3
+arc consistency for a CSP whose binary constraints are all NotEqualConstraints
+for NotEqual, a value loses its support only when a neighbour is down to that
+single value, so each wave removes the values of all new singletons from all
+of their neighbours at once
+returns the assignment with reduced domains, or None if a domain is wiped out
+"""
+
+
+def notEqualAC3(assignment, csp):
+    arrays = NotEqualArrays(csp)
+    domains = arrays.domainMatrix(assignment.varDomains)
+    initial = domains.copy()
+    propagated = np.zeros(len(arrays.variables), dtype=bool)
+
+    while True:
+        sizes = domains.sum(axis=1)
+        if (sizes == 0).any():
+            return None
+        wave = np.flatnonzero((sizes == 1) & ~propagated)
+        if len(wave) == 0:
+            break
+        propagated[wave] = True
+        edges = arrays.outgoingEdges(wave)
+        if len(edges) == 0:
+            continue
+        singletonValue = np.argmax(domains[wave], axis=1)
+        sourceValue = np.repeat(singletonValue, arrays.indptr[wave + 1] - arrays.indptr[wave])
+        domains[arrays.indices[edges], sourceValue] = False
+
+    for i, j in zip(*np.nonzero(initial & ~domains)):
+        assignment.varDomains[arrays.variables[i]].discard(arrays.values[j])
+    return assignment
+
+
+class SolutionValidator(object):
+    """
+    Checks many complete assignments of one CSP at once. Assignments are rows
+    of an integer matrix with one column per variable in csp.variables order,
+    each entry the value's position in self.values (-1 for no value). Values
+    outside every domain get codes from len(self.values) up, one per distinct
+    value, so they still compare equal to each other. Domain, NotEqual and
+    Good/Bad value constraints are checked by gathers over index arrays, one
+    violation counted per broken constraint as in violatedConstraints.
+    """
+
+    def __init__(self, csp):
+        self.variables = list(csp.variables)
+        self.varIndex = dict((var, i) for i, var in enumerate(self.variables))
+        values = set()
+        for domain in csp.varDomains.values():
+            values.update(domain)
+        for constraint in csp.unaryConstraints: # so every Good/Bad value has a code of its own
+            values.update(value for name, value in vars(constraint).items() if name in ('goodValue', 'badValue'))
+        self.values = sorted(values, key=repr)
+        self.valueIndex = dict((value, j) for j, value in enumerate(self.values))
+        self.foreignIndex = {} # value outside self.values -> its code, handed out by encode
+
+        self.allowed = np.zeros((len(self.variables), len(self.values)), dtype=bool)
+        for var, domain in csp.varDomains.items():
+            for value in domain:
+                self.allowed[self.varIndex[var], self.valueIndex[value]] = True
+
+        pairs = []
+        for constraint in csp.binaryConstraints:
+            # matched by name: BinaryCSP imports this module, not the other way round
+            if type(constraint).__name__ != 'NotEqualConstraint':
+                raise ValueError('bulk validation handles NotEqual constraints only, got %r' % (constraint,))
+            pairs.append((self.varIndex[constraint.var1], self.varIndex[constraint.var2]))
+        self.src = np.array([a for a, b in pairs], dtype=np.int64)
+        self.dst = np.array([b for a, b in pairs], dtype=np.int64)
+
+        good, bad = [], []
+        for constraint in csp.unaryConstraints:
+            kind = type(constraint).__name__
+            if kind == 'GoodValueConstraint':
+                good.append((self.varIndex[constraint.var], self.valueIndex[constraint.goodValue]))
+            elif kind == 'BadValueConstraint':
+                bad.append((self.varIndex[constraint.var], self.valueIndex[constraint.badValue]))
+            else:
+                raise ValueError('bulk validation handles Good/Bad value constraints only, got %r' % (constraint,))
+        self.goodVar = np.array([var for var, code in good], dtype=np.int64)
+        self.goodCode = np.array([code for var, code in good], dtype=np.int64)
+        self.badVar = np.array([var for var, code in bad], dtype=np.int64)
+        self.badCode = np.array([code for var, code in bad], dtype=np.int64)
+
+    def encode(self, solutions):
+        """
+        Integer matrix for a list of {variable: value} solutions.
+        """
+        matrix = np.full((len(solutions), len(self.variables)), -1, dtype=np.int32)
+        for row, solution in enumerate(solutions):
+            for var, value in solution.items():
+                if var in self.varIndex:
+                    matrix[row, self.varIndex[var]] = self.code(value)
+        return matrix
+
+    def code(self, value):
+        code = self.valueIndex.get(value)
+        if code is None:
+            code = self.foreignIndex.setdefault(value, len(self.values) + len(self.foreignIndex))
+        return code
+
+    def violations(self, matrix):
+        """
+        Number of violated constraints per row; 0 marks a valid assignment.
+        """
+        matrix = np.asarray(matrix)
+        present = matrix >= 0
+        known = present & (matrix < len(self.values))
+        codes = np.where(known, matrix, 0)
+        columns = np.arange(len(self.variables))[None, :]
+        counts = (~(known & self.allowed[columns, codes])).sum(axis=1)
+        if len(self.src):
+            left, right = matrix[:, self.src], matrix[:, self.dst]
+            counts += ((left == right) & (left >= 0)).sum(axis=1)
+        # a missing value already counts as a domain violation, not against its unary constraints too
+        if len(self.goodVar):
+            counts += ((matrix[:, self.goodVar] != self.goodCode) & present[:, self.goodVar]).sum(axis=1)
+        if len(self.badVar):
+            counts += ((matrix[:, self.badVar] == self.badCode) & present[:, self.badVar]).sum(axis=1)
+        return counts
+
+    def violations_chunked(self, matrix, chunkRows=65536):
+        """
+        Yields violations() for successive blocks of chunkRows rows, so a
+        memory-mapped matrix (see load_assignments) larger than RAM is only read
+        one block at a time.
+        """
+        for start in range(0, len(matrix), chunkRows):
+            yield self.violations(np.asarray(matrix[start:start + chunkRows]))
+
+
+"""
+load assignments
+opens a .npy matrix of encoded assignments memory-mapped, for violations_chunked
+"""
+
+
+def load_assignments(path):
+    return np.load(path, mmap_mode='r')